@@ -11,10 +11,12 @@ if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 from claims_autopilot.extractor import extract_claim_from_text
-from claims_autopilot.validator import load_rules, validate
+from claims_autopilot.validator import load_compiled_rules, validate
 from claims_autopilot.questioner import questions_from_issues
 from claims_autopilot.generator import export_outputs, to_table
-from claims_autopilot.denial import extract_codes, load_codebook, lookup_meanings, build_denial_plan
+from claims_autopilot.worklist import Worklist
+from claims_autopilot.denial import extract_codes, load_codebook_index, lookup_meanings, build_denial_plan
+from claims_autopilot.resources import resource_stats
 
 st.set_page_config(page_title="Claims Autopilot Agent", layout="wide")
 st.title("Claims Autopilot Agent (Synthetic Demo)")
@@ -53,7 +55,7 @@ with tab2:
     if not st.session_state.packet:
         st.warning("Go to 'Build Claim' and extract a claim first.")
     else:
-        rules = load_rules("data/rules.yml")
+        rules = load_compiled_rules("data/rules.yml")  # parsed once, reloaded when the file changes
         report = validate(st.session_state.packet, rules)
         st.write("Risk:", report["risk"])
         st.write("Issues:")
@@ -73,6 +75,16 @@ with tab2:
             paths = export_outputs(st.session_state.packet)
             st.success(f"Saved: {paths}")
 
+    with st.expander("Batch worklist (missing info across a precheck-batch run)"):
+        results = st.file_uploader("precheck-batch results (.jsonl)", type=["jsonl"])
+        if results is not None:
+            wl = Worklist(load_compiled_rules("data/rules.yml").source)
+            wl.add_results(json.loads(line) for line in results.getvalue().decode("utf-8").splitlines() if line.strip())
+            st.write(wl.stats())
+            rows = wl.rows()
+            st.dataframe([{**r, "claim_ids": " ".join(r["claim_ids"])} for r in rows], use_container_width=True)
+            st.download_button("Download worklist (JSON)", json.dumps(rows, indent=2), file_name="worklist.json")
+
 with tab3:
     st.subheader("Denial → correction plan + appeal draft")
     denial_txt = st.text_area("Paste synthetic ERA/EOB/denial text", height=220)
@@ -84,7 +96,7 @@ with tab3:
 
     if st.button("Analyze denial (LLM)") and denial_txt.strip():
         carc, rarc = extract_codes(denial_txt)
-        codebook = load_codebook("data/carc_rarc_subset.csv")
+        codebook = load_codebook_index("data/carc_rarc_subset.csv")
         meanings = lookup_meanings(codebook, carc, rarc)
 
         st.write("Codes found:", {"CARC": carc, "RARC": rarc})
@@ -100,3 +112,6 @@ with tab3:
         st.write(plan.correction_steps)
         st.write("Appeal draft (short):")
         st.code(plan.appeal_draft)
+
+with st.sidebar.expander("Rules / codebook cache"):
+    st.json(resource_stats())
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import glob, json, os, sys, time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+from .extractor import extract_claim_from_text
+from .validator import CompiledRules, compile_rules, validate, with_issues
+from .questioner import questions_from_issues
+from .llm import cache_stats
+from .generator import ClaimExporter
+from .journal import JobJournal
+from .duplicates import DUPLICATE_ISSUES, DuplicateIndex
+from .worklist import Worklist
+from .reprecheck import ClaimIndex, index_path, rule_paths, rules_snapshot_path
+from .utils import claim_key
+
+def collect_inputs(source: str, pattern: str = "*.txt") -> List[Path]:
+    p = Path(source)
+    if p.is_dir():
+        return sorted(x for x in p.glob(pattern) if x.is_file())
+    return sorted(Path(x) for x in glob.glob(source, recursive=True) if Path(x).is_file())
+
+def precheck_file(path: Path, rules: Dict[str, Any], policy: Optional[str] = None,
+                  compiled: Optional[CompiledRules] = None, journal: Optional[JobJournal] = None,
+                  duplicates: Optional[DuplicateIndex] = None) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        # A packet journaled by an earlier (interrupted) run is re-validated without extracting again
+        packet_dict = journal.packet(path) if journal is not None else None
+        if packet_dict is None:
+            txt = Path(path).read_text(encoding="utf-8")
+            packet_dict = extract_claim_from_text(txt, policy=policy, rules=rules).model_dump()
+            if journal is not None:
+                journal.mark_extracted(path, packet_dict)
+        report = validate(packet_dict, compiled or rules)
+        claim_id = claim_key(path, packet_dict)
+        if duplicates is not None:
+            report = with_issues(report, duplicates.check_and_add(packet_dict, claim_id))
+        res = {
+            "file": str(path),
+            "claim_id": claim_id,
+            "status": "ok",
+            "risk": report["risk"],
+            "extraction_mode": packet_dict["meta"].get("extraction_mode"),
+            "issues": report["issues"],
+            "questions": questions_from_issues(report["issues"]),
+            "packet": packet_dict,
+            "elapsed_s": round(time.perf_counter() - t0, 4),
+        }
+        if journal is not None:
+            journal.mark_validated(path)
+        return res
+    except Exception as e:
+        # One bad superbill must not abort the whole batch
+        res = {
+            "file": str(path),
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "elapsed_s": round(time.perf_counter() - t0, 4),
+        }
+        if journal is not None:
+            journal.mark_failed(path, res["error"])
+        return res
+
+def _checkpoint(exporter: ClaimExporter, journal: JobJournal, staged: List[str]) -> None:
+    # Record the part files before committing them, so a crash in between is settled by recover_exports()
+    if not staged:
+        return
+    export_id = journal.begin_export(staged, *exporter.pending_parts())
+    exporter.commit()
+    journal.finish_export(export_id)
+    staged.clear()
+
+def run_batch(paths: List[Path], rules: Dict[str, Any], out_path: str, workers: int = 8,
+              policy: Optional[str] = None, export_dir: Optional[str] = None,
+              lines_format: str = "auto", journal_path: Optional[str] = None,
+              checkpoint_every: int = 500, duplicates_path: Optional[str] = None,
+              worklist_path: Optional[str] = None) -> Dict[str, Any]:
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    risk_counts: Counter = Counter()
+    mode_counts: Counter = Counter()
+    dup_counts: Counter = Counter()
+    errors = lines = 0
+    compiled = compile_rules(rules)
+    journal = JobJournal(journal_path) if journal_path else None
+    duplicates = DuplicateIndex(duplicates_path) if duplicates_path else None
+    worklist = Worklist(rules) if worklist_path else None
+    todo, reused, recovered = list(paths), 0, None
+    if journal is not None:
+        recovered = journal.recover_exports()
+        status = journal.sync(paths)
+        # Journaled packets are re-validated (rules may have changed) but not extracted again
+        reused = sum(1 for p in paths if status[os.path.abspath(p)] in ("extracted", "validated", "exported"))
+    exporter = None
+    if export_dir:
+        # With a journal, parts only rotate at checkpoints: one packets + one lines part per checkpoint
+        max_bytes = sys.maxsize if journal is not None else 128 * 1024 * 1024
+        exporter = ClaimExporter(export_dir, prefix="precheck", lines_format=lines_format, max_bytes=max_bytes)
+        if journal is not None:
+            journal.record_export_run(exporter.stem)
+
+    staged: List[str] = []
+    index = ClaimIndex(rule_paths(rules))  # for `reprecheck`, built as rows are written
+    t0 = time.perf_counter()
+
+    def record(res: Dict[str, Any], f) -> None:
+        nonlocal errors, lines
+        if res["status"] == "ok":
+            index.add(lines, res["packet"], res["risk"])
+            risk_counts[res["risk"]] += 1
+            mode_counts[res["extraction_mode"]] += 1
+            dup_counts.update(i["type"] for i in res["issues"] if i["type"] in DUPLICATE_ISSUES)
+            if worklist is not None:
+                worklist.add(res["claim_id"], res["packet"], res["issues"])
+            if exporter is not None and (journal is None or journal.status(res["file"]) != "exported"):
+                exporter.write(res["packet"], claim_id=res["claim_id"])
+                if journal is not None:
+                    staged.append(res["file"])
+                    if len(staged) >= checkpoint_every:
+                        _checkpoint(exporter, journal, staged)
+        else:
+            errors += 1
+        f.write(json.dumps(res) + "\n")
+        lines += 1
+
+    workers = max(1, workers)
+    max_in_flight = workers * 4  # finished results (with their packets) are written out, not accumulated
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with open(out, "w", encoding="utf-8") as f:
+            running: Set[Future] = set()
+            for p in todo:
+                running.add(pool.submit(precheck_file, p, rules, policy, compiled, journal, duplicates))
+                if len(running) >= max_in_flight:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        record(fut.result(), f)
+            for fut in wait(running).done:
+                record(fut.result(), f)
+    except BaseException:
+        # Ctrl-C / crash: queued inputs stay pending in the journal; keep what was already exported
+        pool.shutdown(wait=False, cancel_futures=True)
+        if exporter is not None and journal is not None:
+            _checkpoint(exporter, journal, staged)
+        raise
+    pool.shutdown()
+    if exporter is not None and journal is not None:
+        _checkpoint(exporter, journal, staged)
+
+    export = exporter.close() if exporter is not None else None
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "total": len(paths),
+        "ok": len(paths) - errors,
+        "errors": errors,
+        "risk_counts": {k: risk_counts.get(k, 0) for k in ("LOW", "MEDIUM", "HIGH")},
+        "extraction_modes": dict(mode_counts),
+        "elapsed_s": round(elapsed, 3),
+        "claims_per_s": round(len(todo) / elapsed, 3) if elapsed > 0 else None,
+        "workers": workers,
+        "llm_cache": cache_stats(),
+        "results": str(out),
+    }
+    if export is not None:
+        summary["export"] = export
+    if duplicates is not None:
+        summary["duplicates"] = {"index": duplicates_path, "indexed_claims": len(duplicates),
+                                 **{t: dup_counts.get(t, 0) for t in DUPLICATE_ISSUES}}
+        duplicates.close()
+    if worklist is not None:
+        summary["worklist"] = {"path": worklist.export(worklist_path), **worklist.stats()}
+    if journal is not None:
+        summary["journal"] = {
+            "path": journal_path,
+            "extracted": len(todo) - reused,
+            "reused_packets": reused,
+            "recovered_exports": recovered,
+            "status_counts": journal.counts(),
+        }
+        journal.close()
+    return write_run_files(out, rules, summary, index)
+
+def write_run_files(out: Path, rules: Dict[str, Any], summary: Dict[str, Any], index: ClaimIndex) -> Dict[str, Any]:
+    # Rules used for this run and the field/code index of its rows, so `reprecheck` can later diff
+    # them against an edited rules.yml and re-validate only the affected rows
+    rules_snapshot_path(str(out)).write_text(json.dumps(rules, indent=2), encoding="utf-8")
+    index.save(index_path(str(out)), out)
+    summary_path = out.with_name(out.stem + ".summary.json")
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    summary["summary"] = str(summary_path)
+    return summary
@@ -0,0 +1,609 @@
+from __future__ import annotations
+import argparse, asyncio, gc, json, random, resource, subprocess, sys, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+# Micro-benchmarks on synthetic data patterned after data/*.txt.
+# Run with: python -m claims_autopilot.bench <name>
+
+CPT_CODES = ["99213", "99214", "71046", "93000", "81002", "36415", "J1100", "G0439"]
+ICD10_CODES = ["M54.5", "J02.9", "R50.9", "E11.9", "I10", "R07.9", "Z00.00", "J45.909"]
+MODIFIERS = ["25", "59", "LT", "RT", "GT"]
+
+def synthetic_superbill(n_lines: int = 1, seed: int = 0, notes_lines: int = 3) -> str:
+    rnd = random.Random(seed)
+    out = [
+        "SUPERBILL (SYNTHETIC DEMO)",
+        "Patient: SYNTHETIC PATIENT",
+        f"DOB: 19{rnd.randint(40, 99)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+        "Insurance: ExamplePayer PPO",
+        f"Member ID: X{rnd.randint(100000000, 999999999)}",
+        "",
+        "Provider: Example Clinic",
+        f"Rendering Provider NPI: {rnd.randint(10**9, 10**10 - 1)}",
+        f"Billing Provider NPI: {rnd.randint(10**9, 10**10 - 1)}",
+        "Location: Los Angeles, CA",
+        f"Date of Service: 2026-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+        "Place of Service: 11 (Office)",
+        "",
+        "Diagnoses (ICD-10):",
+    ]
+    out += [f"- {c} Synthetic diagnosis" for c in rnd.sample(ICD10_CODES, 3)]
+    out += ["", "Procedures (CPT/HCPCS):"]
+    for _ in range(n_lines):
+        out.append(f"- {rnd.choice(CPT_CODES)} Synthetic procedure description")
+        out.append(f"Units: {rnd.randint(1, 4)}")
+        if rnd.random() < 0.4:
+            out.append("Modifiers: " + ", ".join(rnd.sample(MODIFIERS, rnd.randint(1, 2))))
+        out.append("Diagnosis pointer: " + ", ".join(str(i) for i in range(1, rnd.randint(1, 3) + 1)))
+    out += ["", "Notes summary:"]
+    out += [f"- Synthetic visit note {i}. Nothing clinically meaningful here." for i in range(notes_lines)]
+    return "\n".join(out) + "\n"
+
+CARC_CODES = ["16", "96", "197", "50", "204"]  # 50 and 204 are not in data/carc_rarc_subset.csv
+RARC_CODES = ["N265", "N286", "M51", "N290", "MA130"]
+
+def synthetic_era(seed: int = 0) -> str:
+    # Single-claim remittance advice patterned after data/sample_denial_era.txt
+    rnd = random.Random(seed)
+    out = ["REMITTANCE ADVICE (SYNTHETIC DEMO)", f"Claim: SYN-{seed:05d}"]
+    out += [f"Line {i}: CPT {rnd.choice(CPT_CODES)}" for i in range(1, rnd.randint(1, 3) + 1)]
+    out += ["", "Adjustment:"]
+    out += [f"CARC {c} - Synthetic adjustment reason." for c in rnd.sample(CARC_CODES, rnd.randint(1, 2))]
+    out += [f"RARC {c} - Synthetic remark." for c in rnd.sample(RARC_CODES, rnd.randint(0, 2))]
+    out += ["", "Next step: Submit corrected claim with the missing details."]
+    return "\n".join(out) + "\n"
+
+def _rate(fn: Callable[[], Any], min_time_s: float = 0.3) -> float:
+    # Calls per second, repeating until at least min_time_s has elapsed
+    n, t0 = 0, time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time_s:
+            return n / elapsed
+
+def bench_extract(sizes: List[int]) -> List[Dict[str, Any]]:
+    from .extractor import _regex_extract_multipass, parse_superbill
+
+    rows = []
+    for n in sizes:
+        txt = synthetic_superbill(n_lines=n, seed=n, notes_lines=max(3, n // 2))
+        same = _regex_extract_multipass(txt).model_dump() == parse_superbill(txt).model_dump()
+        old = _rate(lambda: _regex_extract_multipass(txt))
+        new = _rate(lambda: parse_superbill(txt))
+        mb = len(txt.encode("utf-8")) / 1e6
+        rows.append({
+            "service_lines": n,
+            "bytes": len(txt),
+            "multipass_per_s": round(old, 1),
+            "single_pass_per_s": round(new, 1),
+            "multipass_mb_s": round(old * mb, 2),
+            "single_pass_mb_s": round(new * mb, 2),
+            "speedup": round(new / old, 2),
+            "same_output": same,
+        })
+    return rows
+
+def synthetic_packets(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    # Claim dicts shaped like ClaimPacket.model_dump(), with some fields randomly missing
+    from .extractor import parse_superbill
+
+    rnd = random.Random(seed)
+    templates = [parse_superbill(synthetic_superbill(n_lines=k, seed=k)).model_dump() for k in range(1, 9)]
+    packets = []
+    for i in range(n):
+        p = json.loads(json.dumps(templates[i % len(templates)]))
+        p["meta"]["claim_id"] = f"SYN-{i:07d}"
+        for path in ("patient.member_id", "providers.rendering_npi", "claim.place_of_service"):
+            if rnd.random() < 0.1:
+                section, key = path.split(".")
+                p[section][key] = None
+        if rnd.random() < 0.3:
+            p["providers"]["ordering_provider_name"] = "Dr Synthetic"
+        packets.append(p)
+    return packets
+
+def bench_validate(n: int, rules_path: str) -> Dict[str, Any]:
+    from .validator import compile_rules, load_rules, validate
+
+    rules = load_rules(rules_path)
+    compiled_rules = compile_rules(rules)
+    packets = synthetic_packets(n)
+
+    # GC pauses from the result lists would otherwise dominate the comparison
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        interpreted = [validate(p, rules) for p in packets]
+        t1 = time.perf_counter()
+        compiled = [validate(p, compiled_rules) for p in packets]
+        t2 = time.perf_counter()
+    finally:
+        gc.enable()
+    return {
+        "claims": n,
+        "interpreted_per_s": round(n / (t1 - t0), 1),
+        "compiled_per_s": round(n / (t2 - t1), 1),
+        "speedup": round((t1 - t0) / (t2 - t1), 2),
+        "same_output": interpreted == compiled,
+    }
+
+def bench_validate_frame(n: int, rules_path: str) -> Dict[str, Any]:
+    from .columnar import packets_to_frames, validate_frame
+    from .validator import load_rules, validate
+
+    rules = load_rules(rules_path)
+    packets = synthetic_packets(n)
+
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        looped = [validate(p, rules) for p in packets]
+        t1 = time.perf_counter()
+        claims, lines = packets_to_frames(packets)
+        t2 = time.perf_counter()
+        frame = validate_frame(claims, lines, rules)
+        t3 = time.perf_counter()
+        validate_frame(claims, lines, rules, with_issues=False)
+        t4 = time.perf_counter()
+    finally:
+        gc.enable()
+    same = looped == [{"risk": r, "issues": i} for r, i in zip(frame["risk"], frame["issues"])]
+    return {
+        "claims": n,
+        "loop_validate_s": round(t1 - t0, 3),
+        "build_frames_s": round(t2 - t1, 3),
+        "validate_frame_s": round(t3 - t2, 3),
+        "validate_frame_risk_only_s": round(t4 - t3, 3),
+        "speedup": round((t1 - t0) / (t3 - t2), 2),
+        "speedup_risk_only": round((t1 - t0) / (t4 - t3), 2),
+        "same_output": same,
+    }
+
+# Prompt layouts used before prompts.py, kept here as the baseline for `bench prompts`
+LEGACY_EXTRACT_USER = """Extract a ClaimPacket from the following text.
+
+TEXT:
+{txt}
+
+Return JSON with keys: patient, providers, claim, meta.
+"""
+
+LEGACY_DENIAL_USER = """Denial text:
+{denial_text}
+
+Known meanings:
+{meanings}
+
+Return a DenialPlan JSON."""
+
+def bench_prompts(superbill_path: str, denial_path: str, codebook_path: str) -> List[Dict[str, Any]]:
+    from .denial import SYSTEM as DENIAL_SYSTEM, _denial_prompt, extract_codes, load_codebook_index
+    from .extractor import SYSTEM as EXTRACT_SYSTEM, _llm_prompt, _regex_pass
+    from .prompts import estimate_tokens
+
+    superbill = open(superbill_path, encoding="utf-8").read()
+    # Same superbill with the member ID line dropped, so regex-first actually calls the LLM
+    partial = "\n".join(l for l in superbill.splitlines() if not l.lower().startswith("member id")) + "\n"
+    noisy = synthetic_superbill(n_lines=3, seed=1, notes_lines=25)
+    denial = open(denial_path, encoding="utf-8").read()
+    meanings = load_codebook_index(codebook_path).lookup(*extract_codes(denial))
+
+    cases = [
+        ("extract llm-first (sample_superbill)", EXTRACT_SYSTEM, superbill, "llm-first"),
+        ("extract regex-first, member ID missing", EXTRACT_SYSTEM, partial, "regex-first"),
+        ("extract llm-first, 25 note lines", EXTRACT_SYSTEM, noisy, "llm-first"),
+    ]
+    rows = []
+    for name, system, txt, policy in cases:
+        packet, _ = _regex_pass(txt, policy, None)
+        before = estimate_tokens(system) + estimate_tokens(LEGACY_EXTRACT_USER.format(txt=txt))
+        after = estimate_tokens(system) + estimate_tokens(_llm_prompt(txt, packet))
+        rows.append({"prompt": name, "tokens_before": before, "tokens_after": after, "saved_pct": round(100 * (1 - after / before), 1)})
+    before = estimate_tokens(DENIAL_SYSTEM) + estimate_tokens(LEGACY_DENIAL_USER.format(denial_text=denial, meanings=meanings))
+    after = estimate_tokens(DENIAL_SYSTEM) + estimate_tokens(_denial_prompt(denial, meanings))
+    rows.append({"prompt": "denial (sample_denial_era)", "tokens_before": before, "tokens_after": after, "saved_pct": round(100 * (1 - after / before), 1)})
+    return rows
+
+MEMORY_REPRS = ("dict", "pydantic", "compact")
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def _memory_child(repr_name: str, n: int, rules_path: str) -> Dict[str, Any]:
+    # Runs in its own process so ru_maxrss reflects only this representation
+    from .extractor import parse_superbill, parse_superbill_compact
+    from .validator import compile_rules, load_rules, validate
+
+    compiled = compile_rules(load_rules(rules_path))
+    texts = [synthetic_superbill(n_lines=k, seed=k) for k in range(1, 9)]
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    claims: List[Any] = []
+    for i in range(n):
+        txt = texts[i % len(texts)]
+        if repr_name == "compact":
+            c = parse_superbill_compact(txt)
+            c.set_meta("claim_id", f"SYN-{i:07d}")
+        else:
+            c = parse_superbill(txt)
+            c.meta["claim_id"] = f"SYN-{i:07d}"
+            if repr_name == "dict":
+                c = c.model_dump()
+        claims.append(c)
+    high = 0
+    for c in claims:
+        if repr_name == "pydantic":
+            c = c.model_dump()
+        high += validate(c, compiled)["risk"] == "HIGH"
+    elapsed = time.perf_counter() - t0
+    peak = _peak_rss_mb() - base
+    return {
+        "repr": repr_name,
+        "claims": n,
+        "peak_rss_mb": round(peak, 1),
+        "peak_rss_mb_per_100k": round(peak * 100_000 / n, 1),
+        "bytes_per_claim": round(peak * 1024 * 1024 / n),
+        "elapsed_s": round(elapsed, 2),
+        "high_risk": high,
+    }
+
+def bench_memory(n: int, rules_path: str) -> List[Dict[str, Any]]:
+    rows = []
+    for name in MEMORY_REPRS:
+        cmd = [sys.executable, "-m", "claims_autopilot.bench", "memory", "--claims", str(n), "--rules", rules_path, "--repr", name]
+        rows.append(json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout))
+    return rows
+
+E2E_PIPELINES = ("precheck", "denial")
+E2E_MODES = ("single", "threaded", "async")
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    return round(sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))], 2) if sorted_ms else 0.0
+
+def _e2e_child(pipeline: str, mode: str, n: int, workers: int, latency_ms: float, jitter_ms: float,
+               error_rate: float, policy: str, rules_path: str, codebook_path: str) -> Dict[str, Any]:
+    # One pipeline x mode per process, so ru_maxrss is not shared between runs
+    from .fake_llm import FakeBackend
+    from .llm import response_cache, set_backend
+    from .extractor import extract_claim_from_text, aextract_claim_from_text
+    from .validator import load_compiled_rules, load_rules_cached, validate
+    from .questioner import questions_from_issues
+    from .denial import extract_codes, load_codebook_index, lookup_meanings, build_denial_plan, abuild_denial_plan
+
+    backend = FakeBackend(latency_ms, jitter_ms, error_rate, seed=0)
+    set_backend(backend)
+    response_cache.enabled = False
+    rules, compiled = load_rules_cached(rules_path), load_compiled_rules(rules_path)
+    codebook = load_codebook_index(codebook_path)
+
+    if pipeline == "precheck":
+        texts = [synthetic_superbill(n_lines=1 + i % 4, seed=i) for i in range(n)]
+
+        def finish(packet):
+            report = validate(packet.model_dump(), compiled)
+            return questions_from_issues(report["issues"])
+
+        run = lambda txt: finish(extract_claim_from_text(txt, policy=policy, rules=rules))
+
+        async def arun(txt):
+            return finish(await aextract_claim_from_text(txt, policy=policy, rules=rules))
+    else:
+        texts = [synthetic_era(seed=i) for i in range(n)]
+
+        def meanings(txt):
+            carc, rarc = extract_codes(txt)
+            return lookup_meanings(codebook, carc, rarc)
+
+        run = lambda txt: build_denial_plan(txt, meanings(txt))
+
+        async def arun(txt):
+            return await abuild_denial_plan(txt, meanings(txt))
+
+    latencies: List[float] = []
+
+    def one(txt: str) -> bool:
+        t = time.perf_counter()
+        try:
+            run(txt)
+            return True
+        except Exception:
+            return False
+        finally:
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    async def aone(txt: str, slots: asyncio.Semaphore) -> bool:
+        async with slots:
+            t = time.perf_counter()
+            try:
+                await arun(txt)
+                return True
+            except Exception:
+                return False
+            finally:
+                latencies.append((time.perf_counter() - t) * 1000)
+
+    async def arun_all() -> List[bool]:
+        slots = asyncio.Semaphore(workers)
+        return await asyncio.gather(*(aone(t, slots) for t in texts))
+
+    gc.collect()
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if mode == "single":
+        oks = [one(t) for t in texts]
+    elif mode == "threaded":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            oks = list(pool.map(one, texts))
+    else:
+        oks = asyncio.run(arun_all())
+    elapsed = time.perf_counter() - t0
+    lat = sorted(latencies)
+    return {
+        "pipeline": pipeline,
+        "mode": mode,
+        "claims": n,
+        "ok": sum(oks),
+        "claims_per_s": round(n / elapsed, 1),
+        "p50_ms": _pct(lat, 0.5),
+        "p99_ms": _pct(lat, 0.99),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_growth_mb": round(_peak_rss_mb() - base, 1),
+        "llm_calls": backend.calls,
+        "llm_errors": backend.errors,
+    }
+
+def bench_e2e(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rows = []
+    for pipeline in args.pipelines:
+        for mode in args.modes:
+            cmd = [sys.executable, "-m", "claims_autopilot.bench", "e2e", "--run", f"{pipeline}:{mode}",
+                   "--claims", str(args.claims), "--workers", str(args.workers), "--latency-ms", str(args.latency_ms),
+                   "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate), "--policy", args.policy,
+                   "--rules", args.rules, "--codebook", args.codebook]
+            rows.append(json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout))
+    return rows
+
+def bench_sharded(n: int, processes: List[int], chunk_sizes: List[int], rules_path: str) -> List[Dict[str, Any]]:
+    # Regex-only precheck over N synthetic superbill files: process count x chunk size
+    import tempfile
+    from pathlib import Path
+    from .sharded import run_sharded
+    from .validator import load_rules
+
+    rules = load_rules(rules_path)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(n):
+            p = Path(tmp) / f"claim-{i:07d}.txt"
+            p.write_text(synthetic_superbill(n_lines=1 + i % 4, seed=i), encoding="utf-8")
+            paths.append(p)
+        for procs in processes:
+            for size in chunk_sizes:
+                s = run_sharded(paths, rules, str(Path(tmp) / "out" / "results.jsonl"), processes=procs, chunk_size=size)
+                rows.append({
+                    "processes": procs,
+                    "chunk_size": size,
+                    "claims_per_s": s["claims_per_s"],
+                    "parallelism": s["parallelism"],
+                    "worker_claims_per_s": [w["claims_per_s"] for w in s["per_worker"]],
+                })
+    return rows
+
+def _dup_packet(rnd: random.Random, member: int, day: int) -> Dict[str, Any]:
+    lines = [{"cpt_hcpcs": c, "units": rnd.randint(1, 3), "modifiers": rnd.sample(MODIFIERS, rnd.randint(0, 1))}
+             for c in rnd.sample(CPT_CODES, rnd.randint(1, 3))]
+    return {"patient": {"member_id": f"X{member:09d}"}, "providers": {"rendering_npi": str(1000000000 + member % 5000)},
+            "claim": {"date_of_service": f"2026-{1 + day // 28:02d}-{1 + day % 28:02d}", "lines": lines}}
+
+def bench_duplicates(n: int, probes: int, path: str) -> Dict[str, Any]:
+    # Build an index of N historical claims, then time check() for new, exact-duplicate and near-duplicate claims
+    import os
+    from .duplicates import DuplicateIndex
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    rnd = random.Random(0)
+    index = DuplicateIndex(path)
+    history = ((f"H{i:08d}", _dup_packet(rnd, rnd.randrange(n // 4 + 1), rnd.randrange(336))) for i in range(n))
+    t0 = time.perf_counter()
+    index.add_many(history)
+    load_s = time.perf_counter() - t0
+
+    rnd = random.Random(0)  # replay the first claims of history for exact duplicates
+    exact = [_dup_packet(rnd, rnd.randrange(n // 4 + 1), rnd.randrange(336)) for _ in range(probes)]
+    near = [json.loads(json.dumps(p)) for p in exact]
+    for p in near:
+        p["claim"]["lines"][0]["units"] += 1
+    rnd = random.Random(1)
+    new = [_dup_packet(rnd, n + i, rnd.randrange(336)) for i in range(probes)]
+
+    out: Dict[str, Any] = {"claims_indexed": n, "load_s": round(load_s, 2), "load_claims_per_s": round(n / load_s),
+                           "db_mb": round(sum(os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s)) / 2**20, 1)}
+    for name, packets in (("new", new), ("exact", exact), ("near", near)):
+        t0 = time.perf_counter()
+        found = [index.check(p, claim_id="probe") for p in packets]
+        us = (time.perf_counter() - t0) / len(packets) * 1e6
+        out[f"{name}_lookup_us"] = round(us, 1)
+        out[f"{name}_flagged"] = Counter(i["type"] for issues in found for i in issues)
+    index.close()
+    return out
+
+def bench_worklist(n: int, rules_path: str) -> Dict[str, Any]:
+    # Aggregate N validated claims, answer a tenth of them one by one, then export; memory via tracemalloc
+    import tracemalloc
+    from .validator import compile_rules, load_rules, validate
+    from .worklist import Worklist
+
+    rules = load_rules(rules_path)
+    compiled = compile_rules(rules)
+    templates = synthetic_packets(500)
+    reports = [validate(p, compiled)["issues"] for p in templates]
+    rnd = random.Random(0)
+    npis = [str(1000000000 + i) for i in range(50)]
+    for p in templates:
+        if p["providers"]["rendering_npi"]:
+            p["providers"]["rendering_npi"] = rnd.choice(npis)
+
+    tracemalloc.start()
+    wl = Worklist(rules)
+    t0 = time.perf_counter()
+    for i in range(n):
+        wl.add(f"SYN-{i:07d}", templates[i % 500], reports[i % 500])
+    add_s = time.perf_counter() - t0
+    mem_mb = tracemalloc.get_traced_memory()[0] / 2**20
+    t0 = time.perf_counter()
+    answered = range(0, n, 10)
+    for i in answered:
+        wl.resolve(f"SYN-{i:07d}")
+    resolve_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    rows = wl.rows()
+    rows_s = time.perf_counter() - t0
+    tracemalloc.stop()
+    return {"claims": n, **wl.stats(), "add_claims_per_s": round(n / add_s),
+            "resolve_us": round(resolve_s / len(answered) * 1e6, 2), "rows_ms": round(rows_s * 1000, 1),
+            "index_mb": round(mem_mb, 1), "bytes_per_open_item": round(mem_mb * 2**20 / max(1, wl.stats()["open_items"])),
+            "top": {k: rows[0][k] for k in ("field", "npi", "codes", "claims", "unblocks")} if rows else None}
+
+def _importtime(module: str) -> Dict[str, Any]:
+    # Parse `python -X importtime` (stderr: "import time: self | cumulative | name") for one module
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((parts[2].rstrip(), int(parts[1])))
+    # Children are printed before their parent, one indent level (2 spaces) deeper
+    depth = lambda name: (len(name) - len(name.lstrip())) // 2
+    end = next(i for i, (name, _) in enumerate(rows) if name.strip() == module)
+    start = end
+    while start > 0 and depth(rows[start - 1][0]) > depth(rows[end][0]):
+        start -= 1
+    total = rows[end][1]
+    top = sorted(((name.strip(), us) for name, us in rows[start:end] if depth(name) == depth(rows[end][0]) + 1),
+                 key=lambda r: -r[1])[:8]
+    return {"module": module, "import_ms": round(total / 1000, 1),
+            "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in top}}
+
+def bench_startup(requests: int, superbill_path: str) -> Dict[str, Any]:
+    # N one-shot `cli precheck` processes vs. the same N requests through one `cli serve` process.
+    # Regex-only extraction so no LLM call is involved; the difference is process start-up.
+    cli = [sys.executable, "-m", "claims_autopilot.cli"]
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        subprocess.run(cli + ["precheck", "--text-file", superbill_path, "--extraction-policy", "regex-only"],
+                       capture_output=True, check=True)
+    oneshot_s = time.perf_counter() - t0
+
+    req = {"cmd": "precheck", "text_file": superbill_path, "extraction_policy": "regex-only"}
+    lines = "".join(json.dumps({**req, "id": i}) + "\n" for i in range(requests))
+    t0 = time.perf_counter()
+    proc = subprocess.run(cli + ["serve"], input=lines, capture_output=True, text=True, check=True)
+    serve_s = time.perf_counter() - t0
+    replies = [json.loads(line) for line in proc.stdout.splitlines() if line.strip()]
+    return {
+        "imports": [_importtime("claims_autopilot.cli"), _importtime("claims_autopilot.extractor")],
+        "requests": requests,
+        "oneshot_total_s": round(oneshot_s, 3),
+        "oneshot_per_request_ms": round(oneshot_s / requests * 1000, 1),
+        "serve_total_s": round(serve_s, 3),
+        "serve_per_request_ms": round(serve_s / requests * 1000, 1),
+        "serve_ok": sum(r.get("ok", False) for r in replies),
+        "speedup": round(oneshot_s / serve_s, 1) if serve_s else None,
+    }
+
+def main():
+    p = argparse.ArgumentParser(prog="python -m claims_autopilot.bench")
+    sub = p.add_subparsers(dest="name", required=True)
+
+    p1 = sub.add_parser("extract", help="single-pass parser vs. per-field re.search extraction")
+    p1.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+
+    p2 = sub.add_parser("validate", help="compile_rules() vs. interpreting the rules dict per claim")
+    p2.add_argument("--claims", type=int, default=100_000)
+    p2.add_argument("--rules", default="data/rules.yml")
+
+    p3 = sub.add_parser("validate-frame", help="validate_frame() on claim/line tables vs. looping validate()")
+    p3.add_argument("--claims", type=int, default=100_000)
+    p3.add_argument("--rules", default="data/rules.yml")
+
+    p4 = sub.add_parser("memory", help="peak RSS of holding + validating claims as dicts, pydantic models or CompactClaim")
+    p4.add_argument("--claims", type=int, default=100_000)
+    p4.add_argument("--rules", default="data/rules.yml")
+    p4.add_argument("--repr", choices=MEMORY_REPRS, help=argparse.SUPPRESS)
+
+    p5 = sub.add_parser("prompts", help="estimated prompt tokens before/after prompt trimming on the sample data")
+    p5.add_argument("--superbill", default="data/sample_superbill.txt")
+    p5.add_argument("--denial", default="data/sample_denial_era.txt")
+    p5.add_argument("--codebook", default="data/carc_rarc_subset.csv")
+
+    p6 = sub.add_parser("startup", help="import time of the CLI + one-shot precheck processes vs. one `cli serve` worker")
+    p6.add_argument("--requests", type=int, default=20)
+    p6.add_argument("--superbill", default="data/sample_superbill.txt")
+
+    p8 = sub.add_parser("sharded", help="precheck-sharded throughput by process count and chunk size")
+    p8.add_argument("--claims", type=int, default=20_000)
+    p8.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    p8.add_argument("--chunk-sizes", type=int, nargs="+", default=[1, 64])
+    p8.add_argument("--rules", default="data/rules.yml")
+
+    p9 = sub.add_parser("duplicates", help="duplicate-index load rate, size and lookup latency at N claims")
+    p9.add_argument("--claims", type=int, default=1_000_000)
+    p9.add_argument("--probes", type=int, default=5000)
+    p9.add_argument("--index", default="outputs/bench_duplicates.sqlite")
+
+    p10 = sub.add_parser("worklist", help="missing-info worklist add/resolve rate and index memory at N claims")
+    p10.add_argument("--claims", type=int, default=1_000_000)
+    p10.add_argument("--rules", default="data/rules.yml")
+
+    p7 = sub.add_parser("e2e", help="claims/s, p50/p99 and peak RSS for precheck + denial against the offline fake LLM")
+    p7.add_argument("--claims", type=int, default=200)
+    p7.add_argument("--workers", type=int, default=8, help="Threads (threaded) / concurrent tasks (async)")
+    p7.add_argument("--latency-ms", type=float, default=20.0, help="Simulated LLM latency")
+    p7.add_argument("--jitter-ms", type=float, default=5.0)
+    p7.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM calls failing with a retryable error")
+    p7.add_argument("--policy", choices=["llm-first", "regex-first", "regex-only"], default="llm-first")
+    p7.add_argument("--pipelines", nargs="+", choices=E2E_PIPELINES, default=list(E2E_PIPELINES))
+    p7.add_argument("--modes", nargs="+", choices=E2E_MODES, default=list(E2E_MODES))
+    p7.add_argument("--rules", default="data/rules.yml")
+    p7.add_argument("--codebook", default="data/carc_rarc_subset.csv")
+    p7.add_argument("--run", help=argparse.SUPPRESS)
+
+    args = p.parse_args()
+    if args.name == "extract":
+        result: Any = bench_extract(args.sizes)
+    elif args.name == "validate":
+        result = bench_validate(args.claims, args.rules)
+    elif args.name == "validate-frame":
+        result = bench_validate_frame(args.claims, args.rules)
+    elif args.name == "prompts":
+        result = bench_prompts(args.superbill, args.denial, args.codebook)
+    elif args.name == "e2e":
+        if args.run:
+            pipeline, mode = args.run.split(":")
+            result = _e2e_child(pipeline, mode, args.claims, args.workers, args.latency_ms, args.jitter_ms,
+                                args.error_rate, args.policy, args.rules, args.codebook)
+        else:
+            result = bench_e2e(args)
+    elif args.name == "worklist":
+        result = bench_worklist(args.claims, args.rules)
+    elif args.name == "duplicates":
+        result = bench_duplicates(args.claims, args.probes, args.index)
+    elif args.name == "sharded":
+        result = bench_sharded(args.claims, args.processes, args.chunk_sizes, args.rules)
+    elif args.name == "startup":
+        result = bench_startup(args.requests, args.superbill)
+    elif args.name == "memory":
+        result = _memory_child(args.repr, args.claims, args.rules) if args.repr else bench_memory(args.claims, args.rules)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
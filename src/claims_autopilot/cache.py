@@ -0,0 +1,126 @@
+from __future__ import annotations
+import hashlib, json, sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+def cache_key(model: str, system: str, user: str, schema: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, system, user, schema):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class ResponseCache:
+    """Two-level (in-memory LRU + SQLite) cache of LLM JSON responses."""
+
+    PRUNE_EVERY = 256
+    TOUCH_AFTER_S = 3600.0  # accessed_at only feeds LRU pruning, so hour resolution saves a write per hit
+
+    def __init__(self, path: str, ttl_s: float = 7 * 24 * 3600, max_entries: int = 100_000,
+                 memory_entries: int = 1024, enabled: bool = True):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.enabled = enabled
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self.hits = self.memory_hits = self.misses = self.writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        self._mem[key] = (created_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None and now - item[0] <= self.ttl_s:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return item[1]
+            self._mem.pop(key, None)
+
+            db = self._db()
+            row = db.execute("SELECT value, created_at, accessed_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                if row is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+                self.misses += 1
+                return None
+            if now - row[2] > self.TOUCH_AFTER_S:
+                db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                db.commit()
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, separators=(",", ":")), now, now),
+            )
+            db.commit()
+            self._remember(key, now, value)
+            self.writes += 1
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                self._prune(db, now)
+
+    def _prune(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_s,))
+        excess = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+        db.commit()
+
+    def prune(self) -> None:
+        with self._lock:
+            self._prune(self._db(), time.time())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            db = self._db()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits - self.memory_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "memory_entries": len(self._mem),
+        }
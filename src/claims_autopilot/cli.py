@@ -1,48 +1,267 @@
 from __future__ import annotations
-import argparse, json
+import time
+_IMPORT_T0 = time.perf_counter()
+import argparse, json, sys
+from typing import Any, Dict
 from pathlib import Path
-from .extractor import extract_claim_from_text
-from .validator import load_rules, validate
-from .questioner import questions_from_issues
-from .generator import export_outputs
-from .denial import extract_codes, load_codebook, lookup_meanings, build_denial_plan
+from .config import EXTRACTION_POLICIES
+from .generator import EXPORT_FORMATS
+from . import profiling
+from .profiling import span
+_IMPORT_MS = (time.perf_counter() - _IMPORT_T0) * 1000
+
+DUPLICATES_INDEX = "outputs/duplicates.sqlite"
+
+# Subcommands import what they use (pandas, pydantic, openai, yaml) inside the function,
+# so `--help`, code lookups and `serve` start-up do not pay for the others.
+
+def cmd_precheck(text_file: str, policy: str | None = None, duplicates_path: str | None = None):
+    from .extractor import extract_claim_from_text
+    from .validator import load_rules, validate
+    from .questioner import questions_from_issues
+    from .generator import export_outputs
 
-def cmd_precheck(text_file: str):
     txt = Path(text_file).read_text(encoding="utf-8")
-    packet = extract_claim_from_text(txt)
-    packet_dict = packet.model_dump()
+    with span("load_rules"):
+        rules = load_rules("data/rules.yml")
+    packet = extract_claim_from_text(txt, policy=policy, rules=rules)
+    with span("model_dump"):
+        packet_dict = packet.model_dump()
 
-    rules = load_rules("data/rules.yml")
     report = validate(packet_dict, rules)
+    if duplicates_path:
+        from .duplicates import DuplicateIndex
+        from .utils import claim_key
+        from .validator import with_issues
+        with span("duplicates"):
+            found = DuplicateIndex(duplicates_path).check_and_add(packet_dict, claim_key(text_file, packet_dict))
+            report = with_issues(report, found)
     qs = questions_from_issues(report["issues"])
 
     exports = export_outputs(packet_dict)
     out = {"risk": report["risk"], "issues": report["issues"], "questions": qs, "exports": exports}
     print(json.dumps(out, indent=2))
 
+def cmd_precheck_batch(source: str, out: str, workers: int, rules_path: str, pattern: str, policy: str | None = None,
+                       export_dir: str | None = None, lines_format: str = "auto", journal: str | None = None,
+                       duplicates_path: str | None = None, worklist: str | None = None):
+    from .batch import collect_inputs, run_batch
+    from .validator import load_rules
+
+    paths = collect_inputs(source, pattern)
+    rules = load_rules(rules_path)
+    if journal == "auto":
+        journal = str(Path(out).with_suffix(".journal.sqlite"))
+    if worklist == "auto":
+        worklist = str(Path(out).with_suffix(".worklist.csv"))
+    summary = run_batch(paths, rules, out, workers=workers, policy=policy, export_dir=export_dir,
+                        lines_format=lines_format, journal_path=journal, duplicates_path=duplicates_path,
+                        worklist_path=worklist)
+    print(json.dumps(summary, indent=2))
+
+def cmd_precheck_sharded(source: str, out: str, processes: int | None, chunk_size: int, rules_path: str,
+                         pattern: str, policy: str, ordered: bool):
+    from .batch import collect_inputs
+    from .sharded import run_sharded
+    from .validator import load_rules
+
+    paths = collect_inputs(source, pattern)
+    summary = run_sharded(paths, load_rules(rules_path), out, processes=processes, chunk_size=chunk_size,
+                          policy=policy, ordered=ordered)
+    print(json.dumps(summary, indent=2))
+
+def cmd_reprecheck(results: str, rules_path: str, old_rules_path: str | None = None):
+    from .reprecheck import reprecheck_results
+    from .validator import load_rules
+
+    old_rules = load_rules(old_rules_path) if old_rules_path else None
+    print(json.dumps(reprecheck_results(results, load_rules(rules_path), old_rules), indent=2))
+
+def cmd_worklist(results: list[str], out: str, rules_path: str, fmt: str, max_ids: int, top: int, by: str):
+    from .validator import load_rules
+    from .worklist import Worklist, iter_results
+
+    wl = Worklist(load_rules(rules_path), by=[b for b in by.split(",") if b])
+    n = wl.add_results(iter_results(results))
+    path = wl.export(out, fmt, max_ids)
+    rows = wl.rows(max_ids=0)[:top]
+    print(json.dumps({"results_rows": n, **wl.stats(), "worklist": path,
+                      "top": [{k: r[k] for k in ("field", "npi", "codes", "claims", "unblocks")} for r in rows]}, indent=2))
+
 def cmd_denial(text_file: str):
+    from .denial import extract_codes, load_codebook_index, lookup_meanings, build_denial_plan
+
     txt = Path(text_file).read_text(encoding="utf-8")
-    carc, rarc = extract_codes(txt)
-    codebook = load_codebook("data/carc_rarc_subset.csv")
+    with span("denial.extract_codes"):
+        carc, rarc = extract_codes(txt)
+    with span("load_codebook"):
+        codebook = load_codebook_index("data/carc_rarc_subset.csv")
     meanings = lookup_meanings(codebook, carc, rarc)
     plan = build_denial_plan(txt, meanings)
     print(plan.model_dump_json(indent=2))
 
+def cmd_denial_batch(remit_file: str, out: str, plan: bool, plan_mode: str = "per-claim"):
+    from .denial import DenialPlanner, load_codebook_index
+    from .remittance import process_remittance
+
+    codebook = load_codebook_index("data/carc_rarc_subset.csv")
+    planner = DenialPlanner(codebook) if plan_mode == "by-signature" else None
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    claims = with_codes = 0
+    with open(out, "w", encoding="utf-8") as f:
+        for res in process_remittance(remit_file, codebook, plan=plan, planner=planner):
+            claims += 1
+            with_codes += bool(res["carc"] or res["rarc"])
+            f.write(json.dumps(res) + "\n")
+    summary: Dict[str, Any] = {"claims": claims, "claims_with_codes": with_codes, "results": out}
+    if plan:
+        summary["plans"] = planner.stats() if planner else {"denials": with_codes, "llm_calls": with_codes, "llm_calls_saved": 0}
+    print(json.dumps(summary, indent=2))
+
+def cmd_serve(socket_path: str | None, rules_path: str, codebook_path: str):
+    from .serve import Server
+
+    server = Server(rules_path, codebook_path)
+    if socket_path:
+        server.serve_unix(socket_path)
+    else:
+        server.serve_stdio(sys.stdin, sys.stdout)
+
+def cmd_serve_http(host: str, port: int, rules_path: str, codebook_path: str,
+                   window_ms: float, max_batch: int, max_queue: int):
+    from .service import run
+
+    run(host, port, rules_path=rules_path, codebook_path=codebook_path,
+        window_ms=window_ms, max_batch=max_batch, max_queue=max_queue)
+
 def main():
     p = argparse.ArgumentParser()
+    p.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    p.add_argument("--profile", action="store_true", help="Record per-stage timings, token usage and cache hits")
+    p.add_argument("--profile-out", default="outputs/profile.json", help="Where --profile writes its JSON metrics")
+    p.add_argument("--cprofile", default=None, metavar="PATH", help="Also capture a cProfile dump (pstats format) to PATH")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     p1 = sub.add_parser("precheck")
     p1.add_argument("--text-file", required=True)
+    p1.add_argument("--extraction-policy", choices=EXTRACTION_POLICIES, default=None)
+    p1.add_argument("--duplicates", nargs="?", const=DUPLICATES_INDEX, default=None, metavar="PATH",
+                    help=f"Flag duplicate / near-duplicate claims against a persistent index (default {DUPLICATES_INDEX})")
+
+    pb = sub.add_parser("precheck-batch")
+    pb.add_argument("--input", required=True, help="Directory of superbills or a glob pattern")
+    pb.add_argument("--pattern", default="*.txt", help="File pattern when --input is a directory")
+    pb.add_argument("--out", default="outputs/precheck_batch.jsonl")
+    pb.add_argument("--workers", type=int, default=8)
+    pb.add_argument("--rules", default="data/rules.yml")
+    pb.add_argument("--extraction-policy", choices=EXTRACTION_POLICIES, default=None)
+    pb.add_argument("--export-dir", default=None, help="Also append claim packets + service lines to rotating files here")
+    pb.add_argument("--lines-format", choices=EXPORT_FORMATS, default="auto", help="Service-lines file format (auto: parquet if pyarrow is installed)")
+
+    pb.add_argument("--journal", nargs="?", const="auto", default=None, metavar="PATH",
+                    help="Record per-claim progress in a SQLite journal (default <out>.journal.sqlite) and resume from it")
+    pb.add_argument("--duplicates", nargs="?", const=DUPLICATES_INDEX, default=None, metavar="PATH",
+                    help=f"Flag duplicate / near-duplicate claims against a persistent index (default {DUPLICATES_INDEX})")
+    pb.add_argument("--worklist", nargs="?", const="auto", default=None, metavar="PATH",
+                    help="Also write the missing-info worklist (default <out>.worklist.csv; .json for JSON)")
+
+    psh = sub.add_parser("precheck-sharded", help="CPU-bound offline precheck sharded across a process pool")
+    psh.add_argument("--input", required=True, help="Directory of superbills or a glob pattern")
+    psh.add_argument("--pattern", default="*.txt", help="File pattern when --input is a directory")
+    psh.add_argument("--out", default="outputs/precheck_sharded.jsonl")
+    psh.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    psh.add_argument("--chunk-size", type=int, default=64, help="Files per task sent to a worker")
+    psh.add_argument("--rules", default="data/rules.yml")
+    psh.add_argument("--extraction-policy", choices=EXTRACTION_POLICIES, default="regex-only")
+    psh.add_argument("--unordered", action="store_true", help="Write chunks as they finish instead of in input order")
+
+    pr = sub.add_parser("reprecheck", help="Re-validate only the stored batch results affected by a rules.yml edit")
+    pr.add_argument("--results", default="outputs/precheck_batch.jsonl")
+    pr.add_argument("--rules", default="data/rules.yml")
+    pr.add_argument("--old-rules", default=None, help="Rules the results were produced with (default: the snapshot saved by precheck-batch)")
+
+    pw = sub.add_parser("worklist", help="Group missing info across batch results by field / provider / CPT code")
+    pw.add_argument("--results", nargs="+", default=["outputs/precheck_batch.jsonl"],
+                    help="Result files in order; a later row for the same claim replaces the earlier one")
+    pw.add_argument("--out", default="outputs/worklist.csv")
+    pw.add_argument("--rules", default="data/rules.yml")
+    pw.add_argument("--format", choices=["csv", "json", "auto"], default="auto", help="auto: json for a .json --out, else csv")
+    pw.add_argument("--max-ids", type=int, default=20, help="Claim IDs listed per worklist row")
+    pw.add_argument("--by", default="npi,codes", help="Grouping besides field: comma-separated subset of npi,codes ('' for field only)")
+    pw.add_argument("--top", type=int, default=10, help="Rows echoed in the summary")
 
     p2 = sub.add_parser("denial")
     p2.add_argument("--text-file", required=True)
 
+    p3 = sub.add_parser("denial-batch")
+    p3.add_argument("--remit-file", required=True, help="Multi-claim remittance (text 'Claim:' blocks or X12 835)")
+    p3.add_argument("--out", default="outputs/denials.jsonl")
+    p3.add_argument("--plan", action="store_true", help="Also build an LLM correction plan per claim")
+    p3.add_argument("--plan-mode", choices=["per-claim", "by-signature"], default="per-claim",
+                    help="by-signature: one LLM plan template per CARC/RARC combination, filled in per claim")
+
+    ps = sub.add_parser("serve", help="Long-lived worker: JSONL requests on stdin (or a Unix socket), one JSON reply per line")
+    ps.add_argument("--socket", default=None, help="Listen on this Unix socket path instead of stdin/stdout")
+    ps.add_argument("--rules", default="data/rules.yml")
+    ps.add_argument("--codebook", default="data/carc_rarc_subset.csv")
+
+    ph = sub.add_parser("serve-http", help="Asyncio HTTP service: /precheck, /precheck/batch, /denial, /healthz, /metrics")
+    ph.add_argument("--host", default="127.0.0.1")
+    ph.add_argument("--port", type=int, default=8080)
+    ph.add_argument("--rules", default="data/rules.yml")
+    ph.add_argument("--codebook", default="data/carc_rarc_subset.csv")
+    ph.add_argument("--batch-window-ms", type=float, default=5.0, help="How long to collect concurrent requests into one batch")
+    ph.add_argument("--max-batch", type=int, default=64)
+    ph.add_argument("--max-queue", type=int, default=1000, help="Claims queued or in flight before new requests get 503")
+
     args = p.parse_args()
+    if args.no_cache:
+        from .llm import response_cache
+        response_cache.enabled = False
+    if not (args.profile or args.cprofile):
+        _run(args)
+        return
+    profiling.enable()
+    profiling.METRICS.record("cli.imports", _IMPORT_MS)
+    try:
+        with span("cli." + args.cmd):
+            if args.cprofile:
+                import cProfile
+                prof = cProfile.Profile()
+                try:
+                    prof.runcall(_run, args)
+                finally:
+                    Path(args.cprofile).parent.mkdir(parents=True, exist_ok=True)
+                    prof.dump_stats(args.cprofile)
+            else:
+                _run(args)
+    finally:
+        from .llm import cache_stats
+        path = profiling.dump(args.profile_out, {"command": args.cmd, "llm_cache": cache_stats()})
+        print(f"profile written to {path}", file=sys.stderr)
+
+def _run(args: argparse.Namespace):
     if args.cmd == "precheck":
-        cmd_precheck(args.text_file)
+        cmd_precheck(args.text_file, args.extraction_policy, args.duplicates)
+    elif args.cmd == "precheck-batch":
+        cmd_precheck_batch(args.input, args.out, args.workers, args.rules, args.pattern, args.extraction_policy,
+                           args.export_dir, args.lines_format, args.journal, args.duplicates, args.worklist)
+    elif args.cmd == "precheck-sharded":
+        cmd_precheck_sharded(args.input, args.out, args.processes, args.chunk_size, args.rules, args.pattern,
+                             args.extraction_policy, not args.unordered)
+    elif args.cmd == "reprecheck":
+        cmd_reprecheck(args.results, args.rules, args.old_rules)
+    elif args.cmd == "worklist":
+        cmd_worklist(args.results, args.out, args.rules, args.format, args.max_ids, args.top, args.by)
     elif args.cmd == "denial":
         cmd_denial(args.text_file)
+    elif args.cmd == "denial-batch":
+        cmd_denial_batch(args.remit_file, args.out, args.plan, args.plan_mode)
+    elif args.cmd == "serve":
+        cmd_serve(args.socket, args.rules, args.codebook)
+    elif args.cmd == "serve-http":
+        cmd_serve_http(args.host, args.port, args.rules, args.codebook,
+                       args.batch_window_ms, args.max_batch, args.max_queue)
 
 if __name__ == "__main__":
     main()
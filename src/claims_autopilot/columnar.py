@@ -0,0 +1,153 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+
+# Column-oriented precheck for re-validating a whole claims backlog at once.
+# claims: one row per claim, a "claim_id" column plus dotted-path columns ("patient.member_id", ...).
+# lines:  one row per service line with "claim_id" and "cpt_hcpcs" (plus units, modifiers, ...).
+# "claim.lines" checks are answered from the lines table.
+
+LINES_PATH = "claim.lines"
+
+def packets_to_frames(packets: Iterable[Dict[str, Any]], id_path: str = "meta.claim_id") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    packets = list(packets)
+    claims = pd.json_normalize(packets, sep=".")
+    if id_path in claims.columns:
+        ids = claims[id_path].where(claims[id_path].notna(), pd.Series(range(len(claims)), dtype=object))
+    else:
+        ids = pd.Series(range(len(claims)), dtype=object)
+    claims.insert(0, "claim_id", ids.to_numpy())
+    claims = claims.drop(columns=[LINES_PATH], errors="ignore")
+
+    rows = []
+    for cid, p in zip(claims["claim_id"], packets):
+        lines = (p.get("claim") or {}).get("lines") or []
+        for idx, ln in enumerate(lines, start=1):
+            if isinstance(ln, dict):
+                rows.append({
+                    "claim_id": cid,
+                    "line": idx,
+                    "cpt_hcpcs": ln.get("cpt_hcpcs"),
+                    "units": ln.get("units", 1),
+                    "modifiers": ln.get("modifiers", []) or [],
+                    "diagnosis_pointer": ln.get("diagnosis_pointer", []) or [],
+                })
+    lines_df = pd.DataFrame(rows, columns=["claim_id", "line", "cpt_hcpcs", "units", "modifiers", "diagnosis_pointer"])
+    return claims, lines_df
+
+class _FrameView:
+    # Per-call memo: each column, the line -> claim mapping and the code factorization are built once
+    def __init__(self, claims: pd.DataFrame, lines: pd.DataFrame):
+        dup = claims["claim_id"].duplicated()
+        if dup.any():
+            sample = ", ".join(map(str, claims["claim_id"][dup].unique()[:5]))
+            raise ValueError(f"claim_id must be unique in the claims frame; repeated: {sample}")
+        self.claims = claims
+        self.lines = lines
+        self.n = len(claims)
+        self._line_pos: np.ndarray | None = None
+        self._codes: Tuple[np.ndarray, np.ndarray] | None = None
+        self._missing: Dict[str, np.ndarray] = {}
+
+    def line_pos(self) -> np.ndarray:
+        # Row position in `claims` of each service line (-1 if its claim_id is unknown)
+        if self._line_pos is None:
+            self._line_pos = pd.Index(self.claims["claim_id"]).get_indexer(self.lines["claim_id"])
+        return self._line_pos
+
+    def line_counts(self) -> np.ndarray:
+        pos = self.line_pos()
+        return np.bincount(pos[pos >= 0], minlength=self.n)
+
+    def is_missing(self, path: str) -> np.ndarray:
+        # Vectorized form of `val is None or val == "" or val == []`
+        if path not in self._missing:
+            self._missing[path] = self._compute_missing(path)
+        return self._missing[path]
+
+    def _compute_missing(self, path: str) -> np.ndarray:
+        if path == LINES_PATH:
+            return self.line_counts() == 0
+        if path not in self.claims.columns:
+            return np.ones(self.n, dtype=bool)
+        col = self.claims[path]
+        if col.dtype != object:
+            # Typed columns (strings, numbers) cannot hold lists
+            missing = col.isna().to_numpy(dtype=bool)
+            if pd.api.types.is_string_dtype(col.dtype):
+                missing = missing | col.eq("").fillna(False).to_numpy(dtype=bool)
+            return missing
+        arr = col.to_numpy()
+        missing = pd.isna(arr) | (arr == "")
+        is_list = np.frompyfunc(lambda v: type(v) is list, 1, 1)(arr).astype(bool)
+        if is_list.any():
+            missing |= is_list & (np.frompyfunc(len, 1, 1)(np.where(is_list, arr, "")) == 0)
+        return missing
+
+    def list_too_short(self, path: str, min_len: int) -> np.ndarray:
+        # Vectorized form of `not isinstance(val, list) or len(val) < min_len`
+        if path == LINES_PATH:
+            return self.line_counts() < min_len
+        if path not in self.claims.columns or self.claims[path].dtype != object:
+            return np.ones(self.n, dtype=bool)
+        arr = self.claims[path].to_numpy()
+        is_list = np.frompyfunc(lambda v: isinstance(v, list), 1, 1)(arr).astype(bool)
+        lengths = np.frompyfunc(len, 1, 1)(np.where(is_list, arr, "")).astype(np.int64)
+        return ~is_list | (lengths < min_len)
+
+    def has_any_code(self, codes: set) -> np.ndarray:
+        # Strip/compare only the distinct code values, then map back to claims with numpy indexing
+        if self._codes is None:
+            self._codes = pd.factorize(self.lines["cpt_hcpcs"].to_numpy(dtype=object))
+        line_code, uniques = self._codes
+        wanted = np.array([bool(v) and str(v).strip() in codes for v in uniques] + [False], dtype=bool)
+        pos = self.line_pos()
+        hit_pos = pos[wanted[line_code] & (pos >= 0)]  # line_code == -1 (missing) indexes the trailing False
+        out = np.zeros(self.n, dtype=bool)
+        out[hit_pos] = True
+        return out
+
+def validate_frame(claims: pd.DataFrame, lines: pd.DataFrame, rules: Dict[str, Any], with_issues: bool = True) -> pd.DataFrame:
+    view = _FrameView(claims, lines)
+    masks: List[np.ndarray] = []
+    issues: List[Dict[str, str]] = []
+
+    for rf in rules.get("required_fields", []):
+        masks.append(view.is_missing(rf))
+        issues.append({"type": "missing_required", "field": rf, "message": f"Missing required field: {rf}"})
+
+    for chk in rules.get("basic_checks", []):
+        if chk.get("type") == "min_list_len":
+            path = chk.get("path", "")
+            masks.append(view.list_too_short(path, int(chk.get("min", 1))))
+            issues.append({"type": "check_failed", "field": path, "message": chk.get("message", "Check failed")})
+
+    for chk in rules.get("conditional_checks", []):
+        if chk.get("type") == "requires_field_for_codes":
+            codes = set(str(x).strip() for x in (chk.get("codes") or []))
+            field = chk.get("field", "")
+            msg = (chk.get("message") or "Missing field for codes").format(codes=",".join(sorted(codes)))
+            masks.append(view.has_any_code(codes) & view.is_missing(field))
+            issues.append({"type": "conditional_missing", "field": field, "message": msg})
+
+    n = view.n
+    hits = np.column_stack(masks) if masks else np.zeros((n, 0), dtype=bool)
+    severe = np.array([i["type"] != "check_failed" for i in issues], dtype=bool)
+    high = hits[:, severe].any(axis=1) if severe.any() else np.zeros(n, dtype=bool)
+    any_issue = hits.any(axis=1)
+    risk = np.where(high, "HIGH", np.where(any_issue, "MEDIUM", "LOW"))
+
+    out = pd.DataFrame({
+        "claim_id": claims["claim_id"].to_numpy(),
+        "risk": risk,
+        "issue_count": hits.sum(axis=1),
+    })
+    if with_issues:
+        # Only claims with issues need Python-level work to build their issue lists
+        issue_lists: List[List[Dict[str, str]]] = [[] for _ in range(n)]
+        rows, checks = np.nonzero(hits)
+        for r, k in zip(rows.tolist(), checks.tolist()):
+            issue_lists[r].append(dict(issues[k]))
+        out["issues"] = issue_lists
+    return out
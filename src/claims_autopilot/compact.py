@@ -0,0 +1,138 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from operator import attrgetter
+from sys import intern
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .schemas import ClaimPacket
+
+# Slotted, flat stand-in for ClaimPacket used by high-volume batch runs.
+# No pydantic validation happens here: LLM output is still validated by ClaimPacket,
+# while regex-extracted claims (already well-typed) go straight into CompactClaim.
+# validator.validate(), generator.to_table()/export_outputs() accept it directly.
+# Code values repeat across claims, so they are interned and line lists are stored as tuples.
+
+def compact_line(cpt_hcpcs: str, units: int = 1, modifiers: Any = (), diagnosis_pointer: Any = ()) -> "CompactLine":
+    return CompactLine(intern(cpt_hcpcs), units, tuple(intern(m) for m in modifiers), tuple(diagnosis_pointer))
+
+@dataclass(slots=True)
+class CompactLine:
+    cpt_hcpcs: str
+    units: int = 1
+    modifiers: Tuple[str, ...] = ()
+    diagnosis_pointer: Tuple[int, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cpt_hcpcs": self.cpt_hcpcs,
+            "units": self.units,
+            "modifiers": list(self.modifiers),
+            "diagnosis_pointer": list(self.diagnosis_pointer),
+        }
+
+@dataclass(slots=True)
+class CompactClaim:
+    name: str = "SYNTHETIC PATIENT"
+    dob: Optional[str] = None
+    member_id: Optional[str] = None
+    insurance: Optional[str] = None
+    billing_npi: Optional[str] = None
+    rendering_npi: Optional[str] = None
+    ordering_provider_name: Optional[str] = None
+    referring_provider_id: Optional[str] = None
+    date_of_service: Optional[str] = None
+    place_of_service: Optional[str] = None
+    diagnoses: List[str] = field(default_factory=list)
+    lines: List[CompactLine] = field(default_factory=list)
+    meta: Optional[Dict[str, Any]] = None  # only allocated when something is stored
+
+    @classmethod
+    def from_packet(cls, packet: ClaimPacket) -> "CompactClaim":
+        pt, pr, cl = packet.patient, packet.providers, packet.claim
+        return cls(
+            name=pt.name, dob=pt.dob, member_id=pt.member_id, insurance=pt.insurance,
+            billing_npi=pr.billing_npi, rendering_npi=pr.rendering_npi,
+            ordering_provider_name=pr.ordering_provider_name, referring_provider_id=pr.referring_provider_id,
+            date_of_service=cl.date_of_service, place_of_service=cl.place_of_service,
+            diagnoses=[intern(d) for d in cl.diagnoses],
+            lines=[compact_line(ln.cpt_hcpcs, ln.units, ln.modifiers, ln.diagnosis_pointer) for ln in cl.lines],
+            meta=dict(packet.meta) or None,
+        )
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CompactClaim":
+        pt, pr, cl = d.get("patient") or {}, d.get("providers") or {}, d.get("claim") or {}
+        return cls(
+            name=pt.get("name", "SYNTHETIC PATIENT"), dob=pt.get("dob"), member_id=pt.get("member_id"),
+            insurance=pt.get("insurance"),
+            billing_npi=pr.get("billing_npi"), rendering_npi=pr.get("rendering_npi"),
+            ordering_provider_name=pr.get("ordering_provider_name"), referring_provider_id=pr.get("referring_provider_id"),
+            date_of_service=cl.get("date_of_service"), place_of_service=cl.get("place_of_service"),
+            diagnoses=[intern(d) for d in (cl.get("diagnoses") or [])],
+            lines=[
+                compact_line(ln["cpt_hcpcs"], ln.get("units", 1), ln.get("modifiers") or (), ln.get("diagnosis_pointer") or ())
+                for ln in (cl.get("lines") or []) if isinstance(ln, dict)
+            ],
+            meta=dict(d.get("meta") or {}) or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Same shape as ClaimPacket.model_dump()
+        return {
+            "patient": {"name": self.name, "dob": self.dob, "member_id": self.member_id, "insurance": self.insurance},
+            "providers": {
+                "billing_npi": self.billing_npi,
+                "rendering_npi": self.rendering_npi,
+                "ordering_provider_name": self.ordering_provider_name,
+                "referring_provider_id": self.referring_provider_id,
+            },
+            "claim": {
+                "date_of_service": self.date_of_service,
+                "place_of_service": self.place_of_service,
+                "diagnoses": list(self.diagnoses),
+                "lines": [ln.to_dict() for ln in self.lines],
+            },
+            "meta": dict(self.meta or {}),
+        }
+
+    def to_packet(self) -> ClaimPacket:
+        from .schemas import ClaimPacket
+        return ClaimPacket.model_validate(self.to_dict())
+
+    def set_meta(self, key: str, value: Any) -> None:
+        if self.meta is None:
+            self.meta = {}
+        self.meta[key] = value
+
+    def get_path(self, path: str) -> Any:
+        return make_compact_accessor(path)(self)
+
+# Dotted ClaimPacket paths (as used in rules.yml) -> CompactClaim slots
+PATH_SLOTS = {
+    "patient.name": "name",
+    "patient.dob": "dob",
+    "patient.member_id": "member_id",
+    "patient.insurance": "insurance",
+    "providers.billing_npi": "billing_npi",
+    "providers.rendering_npi": "rendering_npi",
+    "providers.ordering_provider_name": "ordering_provider_name",
+    "providers.referring_provider_id": "referring_provider_id",
+    "claim.date_of_service": "date_of_service",
+    "claim.place_of_service": "place_of_service",
+    "claim.diagnoses": "diagnoses",
+    "claim.lines": "lines",
+}
+
+def _none(claim: CompactClaim) -> Any:
+    return None
+
+def make_compact_accessor(path: str) -> Callable[[CompactClaim], Any]:
+    # Same semantics as utils.get_path on the dict form, without building the dict
+    slot = PATH_SLOTS.get(path)
+    if slot is not None:
+        return attrgetter(slot)
+    if path.startswith("meta.") and path.count(".") == 1:
+        key = path[5:]
+        return lambda c: c.meta.get(key) if c.meta else None
+    return _none
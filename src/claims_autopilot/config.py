@@ -4,9 +4,24 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# regex-first: only call the LLM when the regex packet misses a rules.yml required field
+EXTRACTION_POLICIES = ("regex-first", "llm-first", "regex-only")
+
 @dataclass(frozen=True)
 class Settings:
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "")
     model: str = os.getenv("MODEL", "gpt-4o-mini")
+    rules_path: str = os.getenv("RULES_PATH", "data/rules.yml")
+    extraction_policy: str = os.getenv("EXTRACTION_POLICY", "llm-first")
+    llm_timeout_s: float = float(os.getenv("LLM_TIMEOUT_S", "60"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    llm_concurrency: int = int(os.getenv("LLM_CONCURRENCY", "16"))
+    llm_backend: str = os.getenv("LLM_BACKEND", "openai")  # "fake": offline stand-in (fake_llm.py)
+    llm_rate_per_s: float = float(os.getenv("LLM_RATE_PER_S", "0"))  # 0 = unlimited
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+    llm_cache_ttl_s: float = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+    llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
 
-SETTINGS = Settings()
\ No newline at end of file
+SETTINGS = Settings()
@@ -1,27 +1,73 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple
-import re
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Tuple
+import csv, re
 from pydantic import BaseModel, Field
-from .llm import call_json
+from .llm import call_json, acall_json
+from .resources import RESOURCES
+from .prompts import format_meanings
+from .profiling import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def extract_codes(text: str) -> Tuple[List[str], List[str]]:
     carc = re.findall(r"CARC\s*(\d+)", text)
     rarc = re.findall(r"RARC\s*([A-Z]\d+)", text)
     return list(dict.fromkeys(carc)), list(dict.fromkeys(rarc))
 
-def load_codebook(csv_path: str) -> pd.DataFrame:
+NOT_FOUND = "Meaning not found in demo subset."
+
+class Codebook:
+    """CARC/RARC meanings indexed by (code_type, code) for O(1) lookups."""
+
+    def __init__(self, entries: Dict[Tuple[str, str], str]):
+        self._entries = entries
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> "Codebook":
+        entries: Dict[Tuple[str, str], str] = {}
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                # First row wins, like the original DataFrame filter + iloc[0]
+                entries.setdefault((row["code_type"], str(row["code"])), str(row["meaning"]))
+        return cls(entries)
+
+    @classmethod
+    def from_frame(cls, df: Any) -> "Codebook":
+        entries: Dict[Tuple[str, str], str] = {}
+        for code_type, code, meaning in zip(df["code_type"], df["code"].astype(str), df["meaning"]):
+            entries.setdefault((code_type, code), str(meaning))
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def meaning(self, code_type: str, code: str) -> str | None:
+        return self._entries.get((code_type, str(code)))
+
+    def lookup(self, carc: List[str], rarc: List[str]) -> Dict[str, List[Dict[str, str]]]:
+        get = self._entries.get
+        return {
+            "CARC": [{"code": str(c), "meaning": get(("CARC", str(c)), NOT_FOUND)} for c in carc],
+            "RARC": [{"code": str(r), "meaning": get(("RARC", str(r)), NOT_FOUND)} for r in rarc],
+        }
+
+    def lookup_many(self, code_sets: Iterable[Tuple[List[str], List[str]]]) -> List[Dict[str, List[Dict[str, str]]]]:
+        return [self.lookup(carc, rarc) for carc, rarc in code_sets]
+
+def load_codebook(csv_path: str) -> "pd.DataFrame":
+    # The raw CSV as a pandas DataFrame (code_type, code, meaning); lookups should use load_codebook_index
+    import pandas as pd
     return pd.read_csv(csv_path)
 
-def lookup_meanings(codebook: pd.DataFrame, carc: List[str], rarc: List[str]) -> Dict[str, List[Dict[str, str]]]:
-    out = {"CARC": [], "RARC": []}
-    for c in carc:
-        sub = codebook[(codebook["code_type"] == "CARC") & (codebook["code"].astype(str) == str(c))]
-        out["CARC"].append({"code": str(c), "meaning": str(sub.iloc[0]["meaning"]) if len(sub) else "Meaning not found in demo subset."})
-    for r in rarc:
-        sub = codebook[(codebook["code_type"] == "RARC") & (codebook["code"].astype(str) == str(r))]
-        out["RARC"].append({"code": str(r), "meaning": str(sub.iloc[0]["meaning"]) if len(sub) else "Meaning not found in demo subset."})
-    return out
+def load_codebook_index(csv_path: str) -> Codebook:
+    # Parsed once per (path, mtime); editing the CSV picks up the new version on the next call
+    return RESOURCES.get("codebook", csv_path, Codebook.from_csv)
+
+def lookup_meanings(codebook: Any, carc: List[str], rarc: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    if not isinstance(codebook, Codebook):
+        codebook = Codebook.from_frame(codebook)  # pandas DataFrame with code_type/code/meaning columns
+    return codebook.lookup(carc, rarc)
 
 SYSTEM = """You are a revenue-cycle denial assistant.
 Given denial codes and a denial message, produce:
@@ -42,12 +88,79 @@ class DenialPlan(BaseModel):
     correction_steps: List[str] = Field(default_factory=list)
     appeal_draft: str
 
-def build_denial_plan(denial_text: str, meanings: Dict[str, Any]) -> DenialPlan:
-    user = f"""Denial text:
-{denial_text}
+def _denial_prompt(denial_text: str, meanings: Dict[str, Any]) -> str:
+    return f"""Return a DenialPlan JSON.
 
 Known meanings:
-{meanings}
+{format_meanings(meanings)}
+
+Denial text:
+{denial_text.strip()}
+"""
+
+@timed("denial.plan")
+def build_denial_plan(denial_text: str, meanings: Dict[str, Any]) -> DenialPlan:
+    return call_json(SYSTEM, _denial_prompt(denial_text, meanings), DenialPlan)
+
+async def abuild_denial_plan(denial_text: str, meanings: Dict[str, Any]) -> DenialPlan:
+    return await acall_json(SYSTEM, _denial_prompt(denial_text, meanings), DenialPlan)
+
+# Plan templates shared by every denial with the same codes; claim details are filled in locally
+CLAIM_ID_SLOT = "{claim_id}"
+CPT_SLOT = "{cpt_codes}"
+
+TEMPLATE_SYSTEM = SYSTEM + f"""
+The plan is reused for every claim denied with exactly these codes:
+- Do not mention patient names, dates, amounts or other claim-specific facts.
+- In appeal_draft write {CLAIM_ID_SLOT} where the claim number goes and {CPT_SLOT} where the affected service codes go.
+"""
+
+Signature = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+def code_signature(carc: Iterable[str], rarc: Iterable[str]) -> Signature:
+    return tuple(sorted({str(c).strip() for c in carc})), tuple(sorted({str(r).strip().upper() for r in rarc}))
+
+def build_denial_plan_template(meanings: Dict[str, Any]) -> DenialPlan:
+    # meanings covers exactly the signature's codes (unknown codes carry NOT_FOUND)
+    user = f"""Return a DenialPlan JSON template.
+
+Denial codes and known meanings:
+{format_meanings(meanings)}
+"""
+    return call_json(TEMPLATE_SYSTEM, user, DenialPlan)
+
+def render_denial_plan(template: DenialPlan, claim_id: str | None, service_codes: List[str]) -> DenialPlan:
+    claim = claim_id or "(claim number)"
+    cpts = ", ".join(dict.fromkeys(service_codes)) or "(see remittance)"
+    draft = template.appeal_draft
+    if CLAIM_ID_SLOT not in draft:
+        draft = f"Re: Claim {CLAIM_ID_SLOT}, CPT/HCPCS {CPT_SLOT}\n\n" + draft
+    # Plain replace rather than str.format: LLM text may contain other braces
+    fill = lambda t: t.replace(CLAIM_ID_SLOT, claim).replace(CPT_SLOT, cpts)
+    return DenialPlan(
+        plain_english_summary=fill(template.plain_english_summary),
+        likely_missing_items=[fill(x) for x in template.likely_missing_items],
+        correction_steps=[fill(x) for x in template.correction_steps],
+        appeal_draft=fill(draft),
+    )
+
+class DenialPlanner:
+    """Builds one plan template per CARC/RARC signature and renders it for each claim."""
+
+    def __init__(self, codebook: Codebook):
+        self.codebook = codebook
+        self._templates: Dict[Signature, DenialPlan] = {}
+        self.denials = 0
+
+    def plan(self, claim_id: str | None, carc: List[str], rarc: List[str], service_codes: List[str]) -> DenialPlan:
+        sig = code_signature(carc, rarc)
+        template = self._templates.get(sig)
+        if template is None:
+            template = build_denial_plan_template(self.codebook.lookup(*sig))
+            self._templates[sig] = template
+        self.denials += 1
+        return render_denial_plan(template, claim_id, service_codes)
 
-Return a DenialPlan JSON."""
-    return call_json(SYSTEM, user, DenialPlan)
\ No newline at end of file
+    def stats(self) -> Dict[str, int]:
+        calls = len(self._templates)
+        return {"denials": self.denials, "signatures": calls, "llm_calls": calls, "llm_calls_saved": self.denials - calls}
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import hashlib, re, sqlite3, threading, time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .compact import CompactClaim
+from .utils import get_path
+
+# Persistent index of prechecked claims for duplicate-submission checks (SQLite, WAL mode).
+# A claim's fingerprint hashes its normalized member ID, date of service, rendering NPI and sorted
+# (CPT/HCPCS, modifiers, units) lines; near keys hash (member ID, date of service, CPT) per line, so
+# the same visit billed with other units/modifiers/provider is found too. Both are 64-bit integers
+# behind B-tree indexes: each lookup is O(log n) and stays well under a millisecond at millions of claims.
+# A claim only matches claims first seen before it, and re-checking keeps its first-seen time, so
+# re-running a batch (or resuming one) flags exactly the same claims as the first run.
+
+MAX_MATCHES = 5
+DUPLICATE_ISSUES = ("duplicate_claim", "near_duplicate")  # issue types added on top of validate()
+
+def _norm_id(v: Any) -> str:
+    return re.sub(r"[^0-9A-Z]", "", str(v or "").upper())
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _norm_date(v: Any) -> str:
+    s = str(v or "").strip()
+    if _ISO_DATE_RE.fullmatch(s):
+        return s
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y%m%d", "%m-%d-%Y"):
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return s.upper()
+
+def _hash64(*parts: Any) -> int:
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def _fields(packet: Dict[str, Any] | CompactClaim) -> Tuple[str, str, str, List[Tuple[str, Tuple[str, ...], int]]]:
+    if isinstance(packet, CompactClaim):
+        member, dos, npi = packet.member_id, packet.date_of_service, packet.rendering_npi
+        lines = [(ln.cpt_hcpcs, ln.modifiers, ln.units) for ln in packet.lines]
+    else:
+        member, dos = get_path(packet, "patient.member_id"), get_path(packet, "claim.date_of_service")
+        npi = get_path(packet, "providers.rendering_npi")
+        lines = [(ln.get("cpt_hcpcs"), ln.get("modifiers") or (), ln.get("units", 1))
+                 for ln in (get_path(packet, "claim.lines") or []) if isinstance(ln, dict)]
+    norm_lines = sorted(
+        (str(cpt).strip().upper(), tuple(sorted(str(m).strip().upper() for m in mods)), int(units or 1))
+        for cpt, mods, units in lines if cpt
+    )
+    return _norm_id(member), _norm_date(dos), re.sub(r"\D", "", str(npi or "")), norm_lines
+
+def claim_keys(packet: Dict[str, Any] | CompactClaim) -> Optional[Tuple[int, List[int]]]:
+    # (fingerprint, near keys); None when member ID, date of service or lines are missing
+    member, dos, npi, lines = _fields(packet)
+    if not (member and dos and lines):
+        return None
+    fingerprint = _hash64(member, dos, npi, *(f"{c}|{','.join(m)}|{u}" for c, m, u in lines))
+    near = sorted({_hash64(member, dos, cpt) for cpt, _, _ in lines})
+    return fingerprint, near
+
+class DuplicateIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "claim_id TEXT PRIMARY KEY, fingerprint INTEGER NOT NULL, seen_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_fingerprint ON claims(fingerprint)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS near ("
+                "near_key INTEGER NOT NULL, claim_id TEXT NOT NULL, PRIMARY KEY (near_key, claim_id)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_near_claim ON near(claim_id)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _tick(self) -> float:
+        # Strictly increasing first-seen times, so claims indexed in the same instant still have an order
+        self._last = max(time.time(), self._last + 1e-6)
+        return self._last
+
+    def _first_seen(self, db: sqlite3.Connection, claim_id: Optional[str]) -> Optional[float]:
+        row = db.execute("SELECT seen_at FROM claims WHERE claim_id = ?", (claim_id,)).fetchone() if claim_id else None
+        return row[0] if row else None
+
+    def _matches(self, db: sqlite3.Connection, keys: Tuple[int, List[int]], claim_id: Optional[str],
+                 before: float) -> Tuple[List[str], List[str]]:
+        fingerprint, near = keys
+        exact = [r[0] for r in db.execute(
+            "SELECT claim_id FROM claims WHERE fingerprint = ? AND claim_id IS NOT ? AND seen_at < ? LIMIT ?",
+            (fingerprint, claim_id, before, MAX_MATCHES))]
+        marks = ",".join("?" * len(near))
+        similar = [r[0] for r in db.execute(
+            f"SELECT DISTINCT n.claim_id FROM near n JOIN claims c ON c.claim_id = n.claim_id "
+            f"WHERE n.near_key IN ({marks}) AND n.claim_id IS NOT ? AND c.seen_at < ? LIMIT ?",
+            (*near, claim_id, before, MAX_MATCHES + len(exact)))]
+        return exact, [c for c in similar if c not in exact][:MAX_MATCHES]
+
+    def _put(self, db: sqlite3.Connection, keys: Tuple[int, List[int]], claim_id: str, seen_at: float) -> None:
+        # Re-prechecking a claim ID replaces its earlier keys (e.g. after a correction), not its first-seen time
+        db.execute("DELETE FROM near WHERE claim_id = ?", (claim_id,))
+        db.execute("INSERT OR REPLACE INTO claims(claim_id, fingerprint, seen_at) VALUES (?, ?, ?)", (claim_id, keys[0], seen_at))
+        db.executemany("INSERT OR IGNORE INTO near(near_key, claim_id) VALUES (?, ?)", [(k, claim_id) for k in keys[1]])
+
+    def check(self, packet: Dict[str, Any] | CompactClaim, claim_id: Optional[str] = None) -> List[Dict[str, str]]:
+        keys = claim_keys(packet)
+        if keys is None:
+            return []
+        with self._lock:
+            db = self._db()
+            seen = self._first_seen(db, claim_id)
+            return _issues(*self._matches(db, keys, claim_id, float("inf") if seen is None else seen))
+
+    def check_and_add(self, packet: Dict[str, Any] | CompactClaim, claim_id: str) -> List[Dict[str, str]]:
+        # Atomic, so concurrent batch workers see each other's claims
+        keys = claim_keys(packet)
+        if keys is None:
+            return []
+        with self._lock:
+            db = self._db()
+            seen = self._first_seen(db, claim_id)
+            if seen is None:
+                seen = self._tick()
+            exact, similar = self._matches(db, keys, claim_id, seen)
+            self._put(db, keys, claim_id, seen)
+            db.commit()
+        return _issues(exact, similar)
+
+    def add_many(self, claims: Iterable[Tuple[str, Dict[str, Any] | CompactClaim]]) -> int:
+        # Bulk load (e.g. a history backfill) in one transaction, without checking
+        n = 0
+        with self._lock:
+            db = self._db()
+            for claim_id, packet in claims:
+                keys = claim_keys(packet)
+                if keys is not None:
+                    seen = self._first_seen(db, claim_id)
+                    self._put(db, keys, claim_id, self._tick() if seen is None else seen)
+                    n += 1
+            db.commit()
+        return n
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def _issues(exact: List[str], similar: List[str]) -> List[Dict[str, str]]:
+    issues = []
+    if exact:
+        issues.append({"type": "duplicate_claim", "field": "claim.duplicate",
+                       "message": f"Same member, date of service, provider and service lines as claim(s): {', '.join(exact)}"})
+    if similar:
+        issues.append({"type": "near_duplicate", "field": "claim.near_duplicate",
+                       "message": f"Same member, date of service and CPT/HCPCS code as claim(s): {', '.join(similar)}"})
+    return issues
@@ -1,8 +1,15 @@
 from __future__ import annotations
-import re
-from typing import Optional, List
+import asyncio, re
+from sys import intern
+from typing import Any, Dict, Optional, List, Tuple
+from .config import SETTINGS, EXTRACTION_POLICIES
 from .schemas import ClaimPacket, ServiceLine
-from .llm import call_json
+from .compact import PATH_SLOTS, CompactClaim, compact_line
+from .prompts import extraction_prompt
+from .utils import get_path
+from .profiling import span, timed
+from .llm import call_json, acall_json
+from .validator import load_rules_cached, validate
 
 SYSTEM = """You are a careful healthcare revenue-cycle assistant.
 Extract a ClaimPacket from a synthetic superbill / visit summary.
@@ -22,14 +29,6 @@ Hard requirements:
 If something is unknown, set it to null/empty list.
 """
 
-USER_TEMPLATE = """Extract a ClaimPacket from the following text.
-
-TEXT:
-{txt}
-
-Return JSON with keys: patient, providers, claim, meta.
-"""
-
 def _find(pattern: str, txt: str) -> Optional[str]:
     m = re.search(pattern, txt, re.IGNORECASE)
     return m.group(1).strip() if m else None
@@ -116,7 +115,8 @@ def _parse_service_lines(txt: str) -> List[ServiceLine]:
     flush()
     return lines
 
-def _regex_extract(txt: str) -> ClaimPacket:
+def _regex_extract_multipass(txt: str) -> ClaimPacket:
+    # Original one-regex-per-field extractor; kept as the reference for parse_superbill
     packet = ClaimPacket()
     packet.patient.name = _find(r"Patient:\s*(.+)", txt) or packet.patient.name
     packet.patient.dob = _find(r"DOB:\s*([0-9]{4}-[0-9]{2}-[0-9]{2})", txt)
@@ -136,6 +136,209 @@ def _regex_extract(txt: str) -> ClaimPacket:
     packet.meta["extraction_mode"] = "regex"
     return packet
 
+# Single-pass superbill parser: every line is visited once, patterns are precompiled, and cheap
+# string tests decide which (if any) regex a line needs. Produces the same packet as
+# _regex_extract_multipass (the original per-field re.search scans).
+_HEADER_RE = re.compile(
+    r"(?P<name>Patient:)|(?P<dob>DOB:)|(?P<insurance>Insurance:)|(?P<member_id>Member\s*ID:)"
+    r"|(?P<billing_npi>Billing\s+Provider\s+NPI:)|(?P<rendering_npi>Rendering\s+Provider\s+NPI:)"
+    r"|(?P<ordering_provider_name>Ordering\s+Provider\s+Name:)"
+    r"|(?P<referring_provider_id>Referring\s+Provider\s+Identifier/NPI:)"
+    r"|(?P<date_of_service>Date\s+of\s+Service:)|(?P<place_of_service>Place\s+of\s+Service:)",
+    re.IGNORECASE,
+)
+# Every header label is one of these words followed by ":"; other lines skip _HEADER_RE
+_HEADER_HINTS = ("patient", "dob", "insurance", "id", "npi", "name", "service")
+_DATE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+_NPI = re.compile(r"[0-9]{10}")
+_REST = re.compile(r".+")
+_HEADER_VALUES = {
+    "name": _REST,
+    "dob": _DATE,
+    "insurance": _REST,
+    "member_id": re.compile(r"[A-Za-z0-9\-]+"),
+    "billing_npi": _NPI,
+    "rendering_npi": _NPI,
+    "ordering_provider_name": _REST,
+    "referring_provider_id": _NPI,
+    "date_of_service": _DATE,
+    "place_of_service": re.compile(r"[0-9]{2}"),
+}
+_SECTION_RE = re.compile(r"\s*(Diagnoses|Procedures|Clinical\s+notes)\b", re.IGNORECASE)
+_DX_ITEM_RE = re.compile(r"\s*-\s*([A-Z][0-9A-Z\.]{2,8})\b")
+_PROC_ITEM_RE = re.compile(r"\s*-\s*([0-9]{5}|[A-Z][0-9A-Z]{3,6})\b")
+_LINE_ATTR_RE = re.compile(r"(?P<units>Units:\s*(?P<n>\d+))|(?P<mods>Modifiers?:)|(?P<ptr>Diagnosis\s+pointer:)", re.IGNORECASE)
+_LIST_SPLIT_RE = re.compile(r"[,\s]+")
+
+_BEFORE, _IN, _DONE = 0, 1, 2
+
+def _may_have_header(line: str) -> bool:
+    if not line.isascii():
+        return True
+    low = line.lower()
+    i = low.find(":")
+    while i >= 0:
+        if low.endswith(_HEADER_HINTS, 0, i):
+            return True
+        i = low.find(":", i + 1)
+    return False
+
+def _header_value(field: str, rest: str) -> Optional[str]:
+    m = _HEADER_VALUES[field].match(rest.lstrip())
+    return m.group(0).strip() if m else None
+
+def _scan_superbill(txt: str) -> Tuple[Dict[str, str], List[str], List[dict]]:
+    # Returns (header fields, diagnosis codes, service-line dicts) in one pass over the text
+    fields: Dict[str, str] = {}
+    # A label at the end of a line takes its value from the next non-blank line (like \s* in re.search).
+    # If only whitespace follows, free-text fields end up "" rather than None.
+    pending: Optional[str] = None
+    pending_ws = False
+    dx: List[str] = []
+    lines: List[dict] = []
+    current: Optional[dict] = None
+    dx_state = proc_state = _BEFORE
+
+    for line in txt.splitlines():
+        if pending is not None:
+            if line.strip():
+                val = _header_value(pending, line)
+                if val is not None and pending not in fields:
+                    fields[pending] = val
+                pending = None
+            elif line:
+                pending_ws = True
+
+        colon = ":" in line
+        if colon and len(fields) < len(_HEADER_VALUES) and _may_have_header(line):
+            for m in _HEADER_RE.finditer(line):
+                field = m.lastgroup
+                if field in fields:
+                    continue
+                rest = line[m.end():]
+                if not rest.strip():
+                    pending, pending_ws = field, bool(rest)
+                    continue
+                val = _header_value(field, rest)
+                if val is not None:
+                    fields[field] = val
+
+        first = line[:1]
+        if first.isspace():
+            first = line.lstrip()[:1]
+        if first == "-":
+            kind = "-"
+        elif first in ("D", "d", "P", "p", "C", "c") and first:
+            sec = _SECTION_RE.match(line)
+            kind = sec.group(1)[0].lower() if sec else ""
+        else:
+            kind = ""
+        if not kind and not colon:
+            continue
+
+        if dx_state != _DONE:
+            if kind == "d":
+                dx_state = _IN
+            elif dx_state == _IN:
+                if kind == "p":
+                    dx_state = _DONE
+                elif kind == "-":
+                    mdx = _DX_ITEM_RE.match(line)
+                    if mdx:
+                        dx.append(mdx.group(1))
+
+        if proc_state == _DONE:
+            continue
+        if kind == "p":
+            proc_state = _IN
+            continue
+        if proc_state == _BEFORE:
+            continue
+        if kind == "-":
+            mp = _PROC_ITEM_RE.match(line)
+            if mp:
+                if current:
+                    lines.append(current)
+                current = {"cpt_hcpcs": mp.group(1), "units": 1, "modifiers": [], "diagnosis_pointer": []}
+                continue
+        if current is None:
+            continue
+
+        units = mods = ptr = None
+        if colon:
+            for ma in _LINE_ATTR_RE.finditer(line):
+                if ma.group("units"):
+                    units = units or ma
+                elif ma.group("mods"):
+                    if mods is None and line[ma.end():]:
+                        mods = ma
+                elif ptr is None and line[ma.end():]:
+                    ptr = ma
+        if units:
+            current["units"] = int(units.group("n")) or 1
+        elif mods:
+            val = line[mods.end():].strip()
+            if val.lower().startswith("(none"):
+                current["modifiers"] = []
+            else:
+                current["modifiers"] = [x for x in _LIST_SPLIT_RE.split(val) if x and x != "(none)"]
+        elif ptr:
+            current["diagnosis_pointer"] = [int(x) for x in _LIST_SPLIT_RE.split(line[ptr.end():].strip()) if x.isdigit()]
+        elif kind == "c":
+            proc_state = _DONE
+
+    if current:
+        lines.append(current)
+    if pending is not None and pending_ws and _HEADER_VALUES[pending] is _REST:
+        fields.setdefault(pending, "")
+    return fields, list(dict.fromkeys(dx)), lines
+
+def parse_superbill(txt: str) -> ClaimPacket:
+    fields, dx, lines = _scan_superbill(txt)
+    packet = ClaimPacket()
+    pt, pr, cl = packet.patient, packet.providers, packet.claim
+    pt.name = fields.get("name") or pt.name
+    pt.dob = fields.get("dob")
+    pt.insurance = fields.get("insurance")
+    pt.member_id = fields.get("member_id")
+    pr.billing_npi = fields.get("billing_npi")
+    pr.rendering_npi = fields.get("rendering_npi")
+    pr.ordering_provider_name = fields.get("ordering_provider_name")
+    pr.referring_provider_id = fields.get("referring_provider_id")
+    cl.date_of_service = fields.get("date_of_service")
+    cl.place_of_service = fields.get("place_of_service")
+    cl.diagnoses = dx
+    cl.lines = [ServiceLine(**ln) for ln in lines]
+    packet.meta["extraction_mode"] = "regex"
+    return packet
+
+def _intern_opt(v: Optional[str]) -> Optional[str]:
+    return intern(v) if v else v
+
+def parse_superbill_compact(txt: str) -> CompactClaim:
+    # Same result as CompactClaim.from_packet(parse_superbill(txt)) without building pydantic models
+    fields, dx, lines = _scan_superbill(txt)
+    get = fields.get
+    return CompactClaim(
+        name=get("name") or "SYNTHETIC PATIENT", dob=get("dob"), member_id=get("member_id"),
+        insurance=_intern_opt(get("insurance")),
+        billing_npi=get("billing_npi"), rendering_npi=get("rendering_npi"),
+        ordering_provider_name=get("ordering_provider_name"), referring_provider_id=get("referring_provider_id"),
+        date_of_service=get("date_of_service"), place_of_service=_intern_opt(get("place_of_service")),
+        diagnoses=[intern(d) for d in dx],
+        lines=[compact_line(ln["cpt_hcpcs"], ln["units"], ln["modifiers"], ln["diagnosis_pointer"]) for ln in lines],
+        meta={"extraction_mode": "regex"},
+    )
+
+# Line breaks for str.splitlines() (which parse_superbill uses) that `.` in the original per-field
+# regexes does not stop at; only a lone \r, not \r\n
+_ODD_BREAK_RE = re.compile("\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+def _regex_extract(txt: str) -> ClaimPacket:
+    if _ODD_BREAK_RE.search(txt):
+        return _regex_extract_multipass(txt)  # keeps the original extractor's output for such text
+    return parse_superbill(txt)
+
 def _merge(base: ClaimPacket, patch: ClaimPacket) -> ClaimPacket:
     b, p = base, patch
 
@@ -169,13 +372,67 @@ def _merge(base: ClaimPacket, patch: ClaimPacket) -> ClaimPacket:
     b.meta = {**(b.meta or {}), **(p.meta or {})}
     return b
 
-def extract_claim_from_text(txt: str) -> ClaimPacket:
-    regex_packet = _regex_extract(txt)
+def _required_missing(packet: ClaimPacket, rules: Optional[Dict[str, Any]]) -> List[str]:
+    rules = rules if rules is not None else _default_rules()
+    report = validate(packet.model_dump(), {"required_fields": rules.get("required_fields", [])})
+    return [i["field"] for i in report["issues"] if i["type"] == "missing_required"]
+
+def _default_rules() -> Dict[str, Any]:
+    return load_rules_cached(SETTINGS.rules_path)
+
+def _regex_pass(txt: str, policy: Optional[str], rules: Optional[Dict[str, Any]]) -> Tuple[ClaimPacket, bool]:
+    # Returns the regex packet and whether the LLM still needs to be called
+    policy = policy or SETTINGS.extraction_policy
+    if policy not in EXTRACTION_POLICIES:
+        raise ValueError(f"Unknown extraction policy {policy!r}; expected one of {EXTRACTION_POLICIES}")
+    with span("extract.regex_parse"):
+        regex_packet = _regex_extract(txt)
+    regex_packet.meta["extraction_policy"] = policy
+    if policy == "regex-only":
+        return regex_packet, False
+    if policy == "regex-first":
+        missing = _required_missing(regex_packet, rules)
+        if not missing:
+            return regex_packet, False
+        regex_packet.meta["regex_missing"] = missing
+    return regex_packet, True
+
+def _unfilled_fields(packet: ClaimPacket) -> List[str]:
+    d = packet.model_dump()
+    return [p for p in PATH_SLOTS if p != "patient.name" and get_path(d, p) in (None, "", [])]
+
+def _llm_prompt(txt: str, regex_packet: ClaimPacket) -> str:
+    # regex-first only asks the LLM for what the regex pass left empty; llm-first asks for everything
+    if regex_packet.meta.get("extraction_policy") == "regex-first":
+        fields = _unfilled_fields(regex_packet)
+        regex_packet.meta["llm_fields"] = fields
+        return extraction_prompt(txt, fields)
+    return extraction_prompt(txt)
+
+def _finish_llm(llm_packet: ClaimPacket, regex_packet: ClaimPacket) -> ClaimPacket:
+    if "llm_fields" in regex_packet.meta:
+        # Scoped request: regex values stay, the LLM only fills the gaps
+        merged = _merge(regex_packet, llm_packet)
+        merged.meta = {**llm_packet.meta, **regex_packet.meta}
+    else:
+        # Patch missing values from regex
+        merged = _merge(llm_packet, regex_packet)
+    merged.meta["extraction_mode"] = "llm"
+    return merged
 
-    # Try LLM extraction first
-    llm_packet = call_json(SYSTEM, USER_TEMPLATE.format(txt=txt), ClaimPacket)
-    llm_packet.meta["extraction_mode"] = "llm"
+@timed("extract")
+def extract_claim_from_text(txt: str, policy: Optional[str] = None, rules: Optional[Dict[str, Any]] = None) -> ClaimPacket:
+    regex_packet, needs_llm = _regex_pass(txt, policy, rules)
+    if not needs_llm:
+        return regex_packet
+    llm_packet = call_json(SYSTEM, _llm_prompt(txt, regex_packet), ClaimPacket)
+    return _finish_llm(llm_packet, regex_packet)
 
-    # Patch missing values from regex
-    merged = _merge(llm_packet, regex_packet)
-    return merged
\ No newline at end of file
+@timed("extract")
+async def aextract_claim_from_text(txt: str, policy: Optional[str] = None, rules: Optional[Dict[str, Any]] = None) -> ClaimPacket:
+    # The regex pass is CPU-bound: run it in a worker thread so the event loop keeps serving
+    regex_packet, needs_llm = await asyncio.to_thread(_regex_pass, txt, policy, rules)
+    if not needs_llm:
+        return regex_packet
+    llm_packet = await acall_json(SYSTEM, _llm_prompt(txt, regex_packet), ClaimPacket)
+    return _finish_llm(llm_packet, regex_packet)
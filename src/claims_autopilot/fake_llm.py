@@ -0,0 +1,107 @@
+from __future__ import annotations
+import asyncio, json, os, random, re, threading, time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Type
+from .llm import TransientLLMError
+from .prompts import estimate_tokens
+
+# Offline stand-in for the chat completions API (LLM_BACKEND=fake).
+# Answers are built from the prompt itself, so they are deterministic and schema-valid:
+# ClaimPacket requests re-run the regex superbill parser on the TEXT section, DenialPlan requests
+# are assembled from the "CARC/RARC code: meaning" lines. Latency and transient errors are simulated.
+
+_MEANING_RE = re.compile(r"^(CARC|RARC) (\S+): (.*)$", re.MULTILINE)
+
+def _claim_packet(user: str) -> Dict[str, Any]:
+    from .extractor import parse_superbill
+    txt = user.split("TEXT:\n", 1)[1] if "TEXT:\n" in user else user
+    return parse_superbill(txt).model_dump(exclude={"meta"})
+
+def _denial_plan(system: str, user: str) -> Dict[str, Any]:
+    from .denial import NOT_FOUND
+    codes = _MEANING_RE.findall(user)
+    missing = [meaning for _, _, meaning in codes if meaning != NOT_FOUND]
+    listed = ", ".join(f"{t} {c}" for t, c, _ in codes) or "no adjustment codes"
+    claim = "{claim_id}" if "{claim_id}" in system else "the claim"
+    return {
+        "plain_english_summary": f"The payer adjusted the claim with {listed}.",
+        "likely_missing_items": missing,
+        "correction_steps": [f"Fix: {m}" for m in missing] + ["Resubmit the corrected claim."],
+        "appeal_draft": f"Re: {claim}\n\nPlease reprocess {claim} after the corrections above ({listed}).",
+    }
+
+def _skeleton(schema: Dict[str, Any], defs: Dict[str, Any]) -> Any:
+    # Smallest value that validates against a JSON schema (for output models the fake doesn't know)
+    if "$ref" in schema:
+        return _skeleton(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "anyOf" in schema:
+        return _skeleton(schema["anyOf"][0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: _skeleton(v, defs) for k, v in schema.get("properties", {}).items() if k in schema.get("required", [])}
+    return {"array": [], "string": "", "integer": 0, "number": 0, "boolean": False}.get(kind)
+
+class FakeBackend:
+    """Deterministic chat completions with configurable latency and error rate."""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeBackend":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "0")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+            self.errors += fail
+        return delay, fail
+
+    def _respond(self, req: Dict[str, Any], output_model: Type, fail: bool) -> Any:
+        if fail:
+            raise TransientLLMError("fake backend: simulated overload", status_code=503)
+        system, user = req["messages"][0]["content"], req["messages"][1]["content"]
+        name = getattr(output_model, "__name__", "")
+        if name == "ClaimPacket":
+            data = _claim_packet(user)
+        elif name == "DenialPlan":
+            data = _denial_plan(system, user)
+        else:
+            schema = output_model.model_json_schema()
+            data = _skeleton(schema, schema.get("$defs", {}))
+        content = json.dumps(data)
+        usage = SimpleNamespace(prompt_tokens=estimate_tokens(system) + estimate_tokens(user),
+                                completion_tokens=estimate_tokens(content), prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def create(self, req: Dict[str, Any], output_model: Type) -> Any:
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        return self._respond(req, output_model, fail)
+
+    async def acreate(self, req: Dict[str, Any], output_model: Type) -> Any:
+        delay, fail = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(req, output_model, fail)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "calls": self.calls, "simulated_errors": self.errors,
+                    "latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate}
@@ -1,10 +1,23 @@
 from __future__ import annotations
-from typing import Dict, Any
-import json
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+import csv, io, json, os, time
 from pathlib import Path
+from .compact import CompactClaim
+from .profiling import span, timed
 
-def to_table(packet: Dict[str, Any]) -> pd.DataFrame:
+if TYPE_CHECKING:
+    import pandas as pd
+
+def to_table(packet: Dict[str, Any] | CompactClaim) -> "pd.DataFrame":
+    import pandas as pd  # deferred: only the table/CSV paths need it
+    if isinstance(packet, CompactClaim):
+        return pd.DataFrame([{
+            "line": idx,
+            "cpt_hcpcs": ln.cpt_hcpcs,
+            "units": ln.units,
+            "modifiers": ",".join(ln.modifiers),
+            "dx_pointer": ",".join(str(x) for x in ln.diagnosis_pointer),
+        } for idx, ln in enumerate(packet.lines, start=1)])
     lines = packet.get("claim", {}).get("lines", []) or []
     rows = []
     for idx, ln in enumerate(lines, start=1):
@@ -17,14 +30,204 @@ def to_table(packet: Dict[str, Any]) -> pd.DataFrame:
         })
     return pd.DataFrame(rows)
 
-def export_outputs(packet: Dict[str, Any], out_dir: str = "outputs") -> Dict[str, str]:
+@timed("export")
+def export_outputs(packet: Dict[str, Any] | CompactClaim, out_dir: str = "outputs") -> Dict[str, str]:
     Path(out_dir).mkdir(parents=True, exist_ok=True)
     json_path = str(Path(out_dir) / "claim_packet.json")
     csv_path = str(Path(out_dir) / "claim_lines.csv")
 
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(packet, f, indent=2)
+    with span("export.json"), open(json_path, "w", encoding="utf-8") as f:
+        json.dump(packet.to_dict() if isinstance(packet, CompactClaim) else packet, f, indent=2)
 
-    df = to_table(packet)
-    df.to_csv(csv_path, index=False)
+    with span("export.csv"):
+        df = to_table(packet)
+        df.to_csv(csv_path, index=False)
     return {"json": json_path, "csv": csv_path}
+
+# --- Streaming export -----------------------------------------------------
+# ClaimExporter appends many claims to rotating part files instead of rewriting the fixed
+# single-claim paths above. Parts are written as "<name>.tmp" and renamed when complete, so a
+# crash never leaves a truncated file under a final name; names carry a run stamp and are never reused.
+
+LINE_COLUMNS = ["claim_id", "line", "cpt_hcpcs", "units", "modifiers", "dx_pointer"]
+EXPORT_FORMATS = ("csv", "parquet", "auto")
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _line_rows(claim_id: Any, packet: Dict[str, Any] | CompactClaim) -> List[tuple]:
+    if isinstance(packet, CompactClaim):
+        return [
+            (claim_id, idx, ln.cpt_hcpcs, ln.units, ",".join(ln.modifiers), ",".join(str(x) for x in ln.diagnosis_pointer))
+            for idx, ln in enumerate(packet.lines, start=1)
+        ]
+    lines = (packet.get("claim") or {}).get("lines", []) or []
+    return [
+        (claim_id, idx, ln.get("cpt_hcpcs"), ln.get("units", 1), ",".join(ln.get("modifiers", []) or []),
+         ",".join(str(x) for x in (ln.get("diagnosis_pointer", []) or [])))
+        for idx, ln in enumerate(lines, start=1)
+    ]
+
+class _PartFile:
+    """One output stream split into size-bounded parts: <stem>-00001.<ext>, <stem>-00002.<ext>, ..."""
+
+    def __init__(self, out_dir: Path, stem: str, ext: str, max_bytes: int):
+        self.out_dir, self.stem, self.ext, self.max_bytes = out_dir, stem, ext, max_bytes
+        self.part = 0
+        self.tmp: Path | None = None
+        self.final: Path | None = None
+        self.done: List[str] = []
+
+    def _next_paths(self) -> None:
+        while True:
+            self.part += 1
+            self.final = self.out_dir / f"{self.stem}-{self.part:05d}.{self.ext}"
+            self.tmp = self.final.with_name(self.final.name + ".tmp")
+            if not (self.final.exists() or self.tmp.exists()):
+                return
+
+    def _commit(self) -> None:
+        # Part names are never reused; refuse rather than overwrite one that appeared meanwhile.
+        # A plain rename works without hardlink support and is atomic, so no crash leaves both names.
+        if self.final.exists():
+            raise FileExistsError(f"export part {self.final} already exists")
+        os.replace(self.tmp, self.final)
+        self.done.append(str(self.final))
+        self.tmp = self.final = None
+
+class _TextParts(_PartFile):
+    def __init__(self, out_dir: Path, stem: str, ext: str, max_bytes: int, header: str = ""):
+        super().__init__(out_dir, stem, ext, max_bytes)
+        self.header = header
+        self.f = None
+        self.size = 0
+
+    def write(self, chunk: str) -> None:
+        if self.f is None:
+            self._next_paths()
+            self.f = open(self.tmp, "x", encoding="utf-8", newline="")
+            self.size = self.f.write(self.header)
+        self.size += self.f.write(chunk)
+        if self.size >= self.max_bytes:
+            self.close()
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.f.close()
+            self.f = None
+            self._commit()
+
+class _ParquetParts(_PartFile):
+    def __init__(self, out_dir: Path, stem: str, max_bytes: int):
+        super().__init__(out_dir, stem, "parquet", max_bytes)
+        import pyarrow as pa
+        self.pa = pa
+        self.schema = pa.schema([
+            ("claim_id", pa.string()), ("line", pa.int32()), ("cpt_hcpcs", pa.string()),
+            ("units", pa.int32()), ("modifiers", pa.string()), ("dx_pointer", pa.string()),
+        ])
+        self.writer = None
+
+    def write(self, rows: List[tuple]) -> None:
+        import pyarrow.parquet as pq
+        if self.writer is None:
+            self._next_paths()
+            self.writer = pq.ParquetWriter(str(self.tmp), self.schema)
+        cols = list(zip(*rows))
+        cols[0] = [str(x) for x in cols[0]]
+        self.writer.write_table(self.pa.Table.from_arrays([self.pa.array(c, t) for c, t in zip(cols, self.schema.types)], schema=self.schema))
+        if os.path.getsize(self.tmp) >= self.max_bytes:
+            self.close()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self._commit()
+
+class ClaimExporter:
+    """Buffered, rotating export of claim packets (JSONL) and their service lines (CSV or Parquet)."""
+
+    def __init__(self, out_dir: str = "outputs/export", prefix: str = "claims", lines_format: str = "auto",
+                 max_bytes: int = 128 * 1024 * 1024, batch_size: int = 1000):
+        if lines_format not in EXPORT_FORMATS:
+            raise ValueError(f"lines_format must be one of {EXPORT_FORMATS}")
+        if lines_format == "auto":
+            lines_format = "parquet" if _has_pyarrow() else "csv"
+        self.lines_format = lines_format
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        stem = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.stem = str(out / stem)  # every part file is "<stem>-NNNNN.<ext>" or "<stem>-lines-NNNNN.<ext>"
+        self._packets = _TextParts(out, stem, "jsonl", max_bytes)
+        if lines_format == "parquet":
+            self._lines: _PartFile = _ParquetParts(out, stem + "-lines", max_bytes)
+        else:
+            self._lines = _TextParts(out, stem + "-lines", "csv", max_bytes, header=",".join(LINE_COLUMNS) + "\r\n")
+        self.batch_size = max(1, batch_size)
+        self._json_buf: List[str] = []
+        self._line_buf: List[tuple] = []
+        self.claims = 0
+        self.lines = 0
+
+    def write(self, packet: Dict[str, Any] | CompactClaim, claim_id: Any = None) -> None:
+        d = packet.to_dict() if isinstance(packet, CompactClaim) else packet
+        if claim_id is None:
+            claim_id = (d.get("meta") or {}).get("claim_id")
+        if claim_id is None:
+            claim_id = self.claims
+        self._json_buf.append(json.dumps(d, separators=(",", ":")) + "\n")
+        self._line_buf.extend(_line_rows(claim_id, packet))
+        self.claims += 1
+        if len(self._json_buf) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._json_buf:
+            self._packets.write("".join(self._json_buf))
+            self._json_buf = []
+        if self._line_buf:
+            self.lines += len(self._line_buf)
+            if isinstance(self._lines, _ParquetParts):
+                self._lines.write(self._line_buf)
+            else:
+                buf = io.StringIO()
+                csv.writer(buf).writerows(self._line_buf)
+                self._lines.write(buf.getvalue())
+            self._line_buf = []
+
+    def pending_parts(self) -> Tuple[Optional[str], Optional[str]]:
+        # Flushes buffered claims; returns the (packets, lines) paths the next commit() will create
+        self.flush()
+        paths = [str(p.final) if p.final else None for p in (self._packets, self._lines)]
+        return paths[0], paths[1]
+
+    def commit(self) -> None:
+        # Commit the open parts now; later writes start new ones
+        self.flush()
+        self._packets.close()
+        self._lines.close()
+
+    def close(self) -> Dict[str, Any]:
+        self.flush()
+        self._packets.close()
+        self._lines.close()
+        return {
+            "claims": self.claims,
+            "lines": self.lines,
+            "lines_format": self.lines_format,
+            "packets": self._packets.done,
+            "service_lines": self._lines.done,
+        }
+
+    def __enter__(self) -> "ClaimExporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import glob, hashlib, json, os, sqlite3, threading, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Durable per-input state for long precheck-batch runs (SQLite in WAL mode).
+# Each input moves pending -> extracted -> validated -> exported, or to failed. Only the extracted packet
+# (the expensive part) is stored: a restarted run re-validates every journaled packet against the current
+# rules without another LLM call and extracts only new and failed inputs. An input whose content changed
+# since it was journaled starts over.
+# Export parts are recorded before they are committed, so after a crash they are either adopted
+# (both files made it) or rolled back and their claims exported again. Each run's part-name prefix is
+# recorded before its first write, so parts it had open when killed are found and removed too,
+# without touching another run's files in the same directory.
+
+STATUSES = ("pending", "extracted", "validated", "exported", "failed")
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _key(path: Any) -> str:
+    return os.path.abspath(str(path))
+
+class JobJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # NORMAL: a committed row survives a process crash; only an OS crash can lose the last few
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "input TEXT PRIMARY KEY, digest TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "packet TEXT, error TEXT, export_id INTEGER, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS exports ("
+                "id INTEGER PRIMARY KEY, packets_path TEXT, lines_path TEXT, committed INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS export_runs (stem TEXT PRIMARY KEY, created_at REAL NOT NULL)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(sql, params)
+            db.commit()
+
+    def sync(self, inputs: Iterable[Any]) -> Dict[str, str]:
+        # Register new inputs as pending and restart those whose content changed; returns input -> status
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            known = {row[0]: (row[1], row[2]) for row in db.execute("SELECT input, digest, status FROM jobs")}
+            status: Dict[str, str] = {}
+            for inp in inputs:
+                key = _key(inp)
+                digest = file_digest(key)
+                old = known.get(key)
+                if old is None:
+                    db.execute("INSERT INTO jobs(input, digest, status, updated_at) VALUES (?, ?, 'pending', ?)", (key, digest, now))
+                    status[key] = "pending"
+                elif old[0] != digest:
+                    db.execute(
+                        "UPDATE jobs SET digest = ?, status = 'pending', attempts = 0, packet = NULL, "
+                        "error = NULL, export_id = NULL, updated_at = ? WHERE input = ?", (digest, now, key))
+                    status[key] = "pending"
+                else:
+                    status[key] = old[1]
+            db.commit()
+        return status
+
+    def status(self, inp: Any) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute("SELECT status FROM jobs WHERE input = ?", (_key(inp),)).fetchone()
+        return row[0] if row else None
+
+    def packet(self, inp: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute("SELECT packet FROM jobs WHERE input = ?", (_key(inp),)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def mark_extracted(self, inp: Any, packet: Dict[str, Any]) -> None:
+        self._write(
+            "UPDATE jobs SET status = 'extracted', attempts = attempts + 1, packet = ?, error = NULL, updated_at = ? WHERE input = ?",
+            (json.dumps(packet, separators=(",", ":")), time.time(), _key(inp)))
+
+    def mark_validated(self, inp: Any) -> None:
+        # Re-validating an already exported input on resume must not make it exportable again
+        self._write("UPDATE jobs SET status = CASE WHEN status = 'exported' THEN status ELSE 'validated' END, "
+                    "updated_at = ? WHERE input = ?", (time.time(), _key(inp)))
+
+    def mark_failed(self, inp: Any, error: str) -> None:
+        self._write("UPDATE jobs SET status = 'failed', attempts = attempts + 1, error = ?, updated_at = ? WHERE input = ?",
+                    (error, time.time(), _key(inp)))
+
+    def record_export_run(self, stem: str) -> None:
+        # Path prefix of every part file an exporter will write (ClaimExporter.stem); call before it writes
+        self._write("INSERT OR IGNORE INTO export_runs(stem, created_at) VALUES (?, ?)", (os.path.abspath(stem), time.time()))
+
+    def begin_export(self, inputs: List[Any], packets_path: Optional[str], lines_path: Optional[str]) -> int:
+        # Call before the part files are committed (see recover_exports)
+        with self._lock:
+            db = self._db()
+            cur = db.execute("INSERT INTO exports(packets_path, lines_path, created_at) VALUES (?, ?, ?)",
+                             (packets_path, lines_path, time.time()))
+            export_id = cur.lastrowid
+            db.executemany("UPDATE jobs SET export_id = ? WHERE input = ?", [(export_id, _key(i)) for i in inputs])
+            db.commit()
+        return export_id
+
+    def finish_export(self, export_id: int) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE jobs SET status = 'exported', updated_at = ? WHERE export_id = ?", (now, export_id))
+            db.execute("UPDATE exports SET committed = 1 WHERE id = ?", (export_id,))
+            db.commit()
+
+    def recover_exports(self) -> Dict[str, int]:
+        # Settle export parts left half-done by a crash: adopt them if every file was committed,
+        # otherwise remove what was written so their claims are exported again. Then remove the
+        # uncommitted parts earlier runs had open (never reached begin_export; not marked exported).
+        adopted = rolled_back = orphans = 0
+        with self._lock:
+            rows = self._db().execute("SELECT id, packets_path, lines_path FROM exports WHERE committed = 0").fetchall()
+        for export_id, *paths in rows:
+            paths = [p for p in paths if p]
+            if all(os.path.exists(p) for p in paths):
+                self.finish_export(export_id)
+                adopted += 1
+                continue
+            for p in paths:
+                for leftover in (p, p + ".tmp"):
+                    if os.path.exists(leftover):
+                        os.unlink(leftover)
+            with self._lock:
+                db = self._db()
+                db.execute("UPDATE jobs SET export_id = NULL WHERE export_id = ?", (export_id,))
+                db.execute("DELETE FROM exports WHERE id = ?", (export_id,))
+                db.commit()
+            rolled_back += 1
+        with self._lock:
+            stems = [r[0] for r in self._db().execute("SELECT stem FROM export_runs")]
+        for stem in stems:
+            for leftover in glob.glob(glob.escape(stem) + "-*.tmp"):
+                os.unlink(leftover)
+                orphans += 1
+        return {"adopted": adopted, "rolled_back": rolled_back, "orphans_removed": orphans}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = dict(self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {s: rows.get(s, 0) for s in STATUSES}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
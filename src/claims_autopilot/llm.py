@@ -1,24 +1,242 @@
 from __future__ import annotations
-import json
-from typing import Type
-from openai import OpenAI
+import asyncio, json, random, sys, threading, time, weakref
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
 from .config import SETTINGS
+from .cache import ResponseCache, cache_key
+from .profiling import incr, record_usage, span, timed
 
-client = OpenAI(api_key=SETTINGS.openai_api_key)
+RETRYABLE_STATUS = {408, 409, 429}
+BACKOFF_BASE_S = 0.5
+BACKOFF_CAP_S = 20.0
 
-def call_json(system: str, user: str, output_model: Type):
-    model = SETTINGS.model
+def _client_kwargs() -> Dict[str, Any]:
+    # Retries are handled here (with jitter + rate limiting), not inside the SDK
+    kw: Dict[str, Any] = {"api_key": SETTINGS.openai_api_key, "timeout": SETTINGS.llm_timeout_s, "max_retries": 0}
+    if SETTINGS.openai_base_url:
+        kw["base_url"] = SETTINGS.openai_base_url
+    return kw
 
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
+# The SDK import and client construction are deferred to the first request
+_client: Any = None
+_client_lock = threading.Lock()
+
+def get_client() -> Any:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(**_client_kwargs())
+    return _client
+
+def __getattr__(name: str) -> Any:
+    # Keeps `llm.client` working for code written against the old eager module attribute
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class TransientLLMError(Exception):
+    """Retryable failure from a non-OpenAI backend (overload, rate limit, timeout)."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+class OpenAIBackend:
+    name = "openai"
+
+    def create(self, req: Dict[str, Any], output_model: Type) -> Any:
+        return get_client().chat.completions.create(**req)
+
+    async def acreate(self, req: Dict[str, Any], output_model: Type) -> Any:
+        # One AsyncOpenAI client (and its connection pool) per running event loop
+        loop = asyncio.get_running_loop()
+        aclient = _async_clients.get(loop)
+        if aclient is None:
+            from openai import AsyncOpenAI
+            aclient = _async_clients[loop] = AsyncOpenAI(**_client_kwargs())
+        return await aclient.chat.completions.create(**req)
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+def make_backend(name: str) -> Any:
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "fake":
+        from .fake_llm import FakeBackend
+        return FakeBackend.from_env()
+    raise ValueError(f"Unknown LLM backend {name!r}; expected 'openai' or 'fake'")
+
+_backend: Any = None
+
+def get_backend() -> Any:
+    global _backend
+    if _backend is None:
+        with _client_lock:
+            if _backend is None:
+                _backend = make_backend(SETTINGS.llm_backend)
+    return _backend
+
+def set_backend(backend: Any) -> Any:
+    # Swap the backend (an object with create/acreate(req, output_model)); returns the previous one
+    global _backend
+    with _client_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: float | None = None):
+        self.rate = rate_per_s
+        self.capacity = burst if burst is not None else max(1.0, rate_per_s)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Take a token now (possibly going negative) and return how long to wait for it
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+rate_limiter = TokenBucket(SETTINGS.llm_rate_per_s)
+response_cache = ResponseCache(
+    SETTINGS.llm_cache_path,
+    ttl_s=SETTINGS.llm_cache_ttl_s,
+    max_entries=SETTINGS.llm_cache_max_entries,
+    enabled=SETTINGS.llm_cache_enabled,
+)
+_sync_slots = threading.BoundedSemaphore(max(1, SETTINGS.llm_concurrency))
+# One concurrency semaphore per running event loop
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _async_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(max(1, SETTINGS.llm_concurrency))
+    return slots
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, TransientLLMError):
+        return True
+    if "openai" not in sys.modules:
+        return False
+    import openai
+    if isinstance(err, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(err, openai.APIStatusError):
+        return err.status_code in RETRYABLE_STATUS or err.status_code >= 500
+    return False
+
+def _backoff_s(attempt: int, err: Exception) -> float:
+    # Full jitter, but never sooner than a server-provided Retry-After
+    delay = random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * (2 ** attempt)))
+    resp = getattr(err, "response", None)
+    retry_after = resp.headers.get("retry-after") if resp is not None else None
+    try:
+        delay = max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        pass
+    return delay
+
+def _request(system: str, user: str) -> Dict[str, Any]:
+    return {
+        "model": SETTINGS.model,
+        "messages": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        response_format={"type": "json_object"},
-        temperature=0,
-    )
+        "response_format": {"type": "json_object"},
+        "temperature": 0,
+    }
 
+def _parse(resp: Any) -> Any:
     content = resp.choices[0].message.content or "{}"
-    data = json.loads(content)
-    return output_model.model_validate(data)
\ No newline at end of file
+    return json.loads(content)
+
+@lru_cache(maxsize=None)
+def _schema_fingerprint(output_model: Type) -> str:
+    schema = getattr(output_model, "model_json_schema", None)
+    return json.dumps(schema(), sort_keys=True) if schema else output_model.__qualname__
+
+def _cache_lookup(system: str, user: str, output_model: Type, use_cache: bool) -> tuple:
+    if not (use_cache and response_cache.enabled):
+        return None, None
+    backend = get_backend().name
+    # Responses from other backends (e.g. the offline fake) never mix with real ones in the cache
+    model = SETTINGS.model if backend == "openai" else f"{backend}/{SETTINGS.model}"
+    key = cache_key(model, system, user, _schema_fingerprint(output_model))
+    data = response_cache.get(key)
+    incr("llm.cache_hits" if data is not None else "llm.cache_misses")
+    return key, data
+
+def _finish(resp: Any, output_model: Type, key: Optional[str]):
+    record_usage(resp)
+    with span("llm.parse"):
+        data = _parse(resp)
+        result = output_model.model_validate(data)
+    # Only cache responses that passed schema validation
+    if key is not None:
+        response_cache.put(key, data)
+    return result
+
+def cache_stats() -> Dict[str, Any]:
+    return response_cache.stats()
+
+@timed("llm.call_json")
+def call_json(system: str, user: str, output_model: Type, use_cache: bool = True):
+    key, data = _cache_lookup(system, user, output_model, use_cache)
+    if data is not None:
+        return output_model.model_validate(data)
+
+    req = _request(system, user)
+    for attempt in range(SETTINGS.llm_max_retries + 1):
+        rate_limiter.acquire()
+        try:
+            with _sync_slots, span("llm.request"):
+                resp = get_backend().create(req, output_model)
+            break
+        except Exception as e:
+            if attempt >= SETTINGS.llm_max_retries or not _is_retryable(e):
+                raise
+            incr("llm.retries")
+            time.sleep(_backoff_s(attempt, e))
+    return _finish(resp, output_model, key)
+
+@timed("llm.call_json")
+async def acall_json(system: str, user: str, output_model: Type, use_cache: bool = True):
+    key, data = _cache_lookup(system, user, output_model, use_cache)
+    if data is not None:
+        return output_model.model_validate(data)
+
+    backend, slots = get_backend(), _async_semaphore()
+    req = _request(system, user)
+    for attempt in range(SETTINGS.llm_max_retries + 1):
+        await rate_limiter.aacquire()
+        try:
+            async with slots:
+                with span("llm.request"):
+                    resp = await backend.acreate(req, output_model)
+            break
+        except Exception as e:
+            if attempt >= SETTINGS.llm_max_retries or not _is_retryable(e):
+                raise
+            incr("llm.retries")
+            await asyncio.sleep(_backoff_s(attempt, e))
+    return _finish(resp, output_model, key)
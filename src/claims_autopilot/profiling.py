@@ -0,0 +1,164 @@
+from __future__ import annotations
+import functools, inspect, json, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Lightweight stage timing for the precheck / denial pipeline.
+# Off by default: span() hands back a shared no-op context manager and @timed wrappers
+# fall straight through, so instrumented code pays one attribute check per call.
+
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+MAX_SAMPLES = 10_000  # per stage, for percentiles
+
+class _Stage:
+    __slots__ = ("count", "total_ms", "min_ms", "max_ms", "buckets", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.samples: List[float] = []
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(ms)
+
+    def summary(self) -> Dict[str, Any]:
+        s = sorted(self.samples)
+        pct = lambda q: round(s[min(len(s) - 1, int(q * len(s)))], 3) if s else None
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "min_ms": round(self.min_ms, 3) if self.count else None,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "histogram": {k: v for k, v in zip(labels, self.buckets) if v},
+        }
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: Dict[str, _Stage] = {}
+            self.counters: Dict[str, int] = {}
+            self.started = time.time()
+
+    def record(self, name: str, ms: float) -> None:
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = _Stage()
+            stage.add(ms)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started,
+                "wall_s": round(time.time() - self.started, 3),
+                "stages": {k: v.summary() for k, v in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+METRICS = Metrics()
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        METRICS.record(self.name, (time.perf_counter() - self.t0) * 1000)
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str) -> Any:
+    return _Span(name) if METRICS.enabled else _NO_SPAN
+
+def timed(name: str) -> Callable:
+    # Decorator form of span() for whole functions (sync or async)
+    def deco(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                if not METRICS.enabled:
+                    return await fn(*args, **kwargs)
+                with _Span(name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def incr(name: str, n: int = 1) -> None:
+    if METRICS.enabled:
+        METRICS.incr(name, n)
+
+def record_usage(resp: Any) -> None:
+    # Token counts from an OpenAI chat completion (usage may be missing on some backends)
+    if not METRICS.enabled:
+        return
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    METRICS.incr("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    METRICS.incr("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+    METRICS.incr("llm.cached_prompt_tokens", cached or 0)
+
+def enable() -> None:
+    METRICS.reset()
+    METRICS.enabled = True
+
+def disable() -> None:
+    METRICS.enabled = False
+
+def dump(path: str, extra: Optional[Dict[str, Any]] = None) -> str:
+    data = METRICS.snapshot()
+    if extra:
+        data.update(extra)
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return str(p)
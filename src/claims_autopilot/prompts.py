@@ -0,0 +1,115 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional
+
+# Prompt construction shared by the extractor and the denial planner.
+# System prompts are module constants so the prefix of every request is byte-identical
+# (provider-side prompt caching keys on it); everything per-claim goes at the end of the user message.
+
+# A note section starts at a header line with nothing after the colon ("Plan: PPO Gold" is not one)
+_NOTES_RE = re.compile(
+    r"\s*(notes?(\s+summary)?|clinical\s+notes|visit\s+notes|hpi|history(\s+of\s+present\s+illness)?"
+    r"|assessment(\s*(and|&)\s*plan)?|plan)\s*:\s*$", re.IGNORECASE)
+_ANY_LABEL_RE = re.compile(r"\s*[A-Za-z][\w /&()#'.-]{0,40}:")
+_KEEP_SECTION_RE = re.compile(r"\s*(?:(?P<dx>diagnoses)|(?P<proc>procedures))\b", re.IGNORECASE)
+_LABEL_RE = re.compile(
+    r"(?P<name>patient)\s*:|(?P<dob>dob)\s*:|(?P<insurance>insurance)\s*:|(?P<member_id>member\s*id)\s*:"
+    r"|(?P<billing_npi>billing\s+provider\s+npi)\s*:|(?P<rendering_npi>rendering\s+provider\s+npi)\s*:"
+    r"|(?P<ordering_provider_name>ordering\s+provider\s+name)\s*:"
+    r"|(?P<referring_provider_id>referring\s+provider\s+(?:identifier|id|npi)(?:/npi)?)\s*:"
+    r"|(?P<date_of_service>date\s+of\s+service)\s*:|(?P<place_of_service>place\s+of\s+service)\s*:", re.IGNORECASE)
+_LABEL_PATHS = {
+    "name": "patient.name", "dob": "patient.dob", "insurance": "patient.insurance", "member_id": "patient.member_id",
+    "billing_npi": "providers.billing_npi", "rendering_npi": "providers.rendering_npi",
+    "ordering_provider_name": "providers.ordering_provider_name", "referring_provider_id": "providers.referring_provider_id",
+    "date_of_service": "claim.date_of_service", "place_of_service": "claim.place_of_service",
+}
+
+def trim_superbill(txt: str, fields: Optional[List[str]] = None) -> str:
+    # Drop free-text note sections (nothing in ClaimPacket comes from them) and blank-line runs.
+    # A note section ends at the next "Label:" line of any kind.
+    # With `fields`, also drop labelled lines and Diagnoses/Procedures sections for fields not asked for.
+    wanted = set(fields) if fields is not None else None
+    out: List[str] = []
+    section: Optional[str] = None  # "notes", "claim.diagnoses", "claim.lines"
+    for line in txt.splitlines():
+        line = line.rstrip()
+        if _NOTES_RE.match(line):
+            section = "notes"
+            continue
+        sec = _KEEP_SECTION_RE.match(line)
+        if sec:
+            section = "claim.diagnoses" if sec.group("dx") else "claim.lines"
+        elif section == "notes" and _ANY_LABEL_RE.match(line):
+            section = None
+        labels = [_LABEL_PATHS[m.lastgroup] for m in _LABEL_RE.finditer(line)]
+        if labels:
+            if wanted is not None and not wanted.intersection(labels):
+                continue
+        elif section == "notes":
+            continue
+        elif wanted is not None and section is not None and section not in wanted:
+            continue
+        if not line and (not out or not out[-1]):
+            continue
+        out.append(line)
+    while out and not out[-1]:
+        out.pop()
+    return "\n".join(out)
+
+EXTRACT_USER_TEMPLATE = """Extract a ClaimPacket from the following text.
+Return JSON with keys: patient, providers, claim, meta.
+{scope}
+TEXT:
+{txt}
+"""
+
+FIELDS_SCOPE = """Only these fields are needed; leave every other field null/empty:
+{fields}
+"""
+
+def extraction_prompt(txt: str, fields: Optional[List[str]] = None) -> str:
+    scope = FIELDS_SCOPE.format(fields="\n".join(f"- {f}" for f in fields)) if fields else ""
+    return EXTRACT_USER_TEMPLATE.format(scope=scope, txt=trim_superbill(txt, fields))
+
+def format_meanings(meanings: Dict[str, Any]) -> str:
+    # One "TYPE CODE: meaning" line per code instead of the dict repr
+    lines = []
+    for code_type in ("CARC", "RARC"):
+        for item in meanings.get(code_type, []) or []:
+            lines.append(f"{code_type} {item.get('code')}: {item.get('meaning')}")
+    return "\n".join(lines) or "none"
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\s+")
+
+def estimate_tokens(text: str) -> int:
+    # Uses tiktoken when installed; otherwise a BPE-like estimate (long words split every ~4 chars,
+    # digits in groups of 3, punctuation on its own, whitespace folded into the next token)
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    n = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece.isspace():
+            n += piece.count("\n") > 1
+        elif piece.isalpha():
+            n += max(1, (len(piece) + 3) // 4)
+        else:
+            n += 1
+    return n
+
+_ENCODING: Any = False
+
+def _encoding() -> Any:
+    global _ENCODING
+    if _ENCODING is False:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _ENCODING = None
+    return _ENCODING
+
+def messages_tokens(system: str, user: str) -> Dict[str, int]:
+    s, u = estimate_tokens(system), estimate_tokens(user)
+    return {"system": s, "user": u, "total": s + u}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Dict, List
+from .profiling import timed
 
 QUESTION_MAP = {
     "patient.member_id": "What is the insurance member ID?",
@@ -9,8 +10,11 @@ QUESTION_MAP = {
     "providers.referring_provider_id": "What is the referring provider identifier/NPI?",
     "claim.date_of_service": "What is the date of service (YYYY-MM-DD)?",
     "claim.place_of_service": "What is the place of service (e.g., 11 for office)?",
+    "claim.duplicate": "Was this claim already submitted? If it corrects an earlier claim, send it as a replacement instead.",
+    "claim.near_duplicate": "Is this a separate service from the earlier claim for the same patient, date and code (add a modifier if so)?",
 }
 
+@timed("questions")
 def questions_from_issues(issues: List[Dict[str, str]]) -> List[str]:
     qs: List[str] = []
     for it in issues:
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO
+from .denial import Codebook, DenialPlanner, build_denial_plan
+
+# Streaming reader for remittance files that bundle many claims. Two layouts are understood:
+# - the plain-text demo format (data/sample_denial_era.txt) with one "Claim: <id>" block per claim
+# - X12 835 (CLP claim loops with CAS adjustments, LQ*HE / MOA / MIA remark codes)
+# Files are read incrementally and only the current claim is kept in memory.
+
+_CLAIM_RE = re.compile(r"^\s*Claim:\s*(\S+)", re.IGNORECASE)
+_SERVICE_LINE_RE = re.compile(r"\bCPT\s*([0-9]{5}|[A-Z][0-9A-Z]{3,6})\b")
+_CARC_RE = re.compile(r"CARC\s*(\d+)")
+_RARC_RE = re.compile(r"RARC\s*([A-Z]\d+)")
+
+READ_CHUNK = 1 << 16
+PREAMBLE_LINES = 200
+
+@dataclass
+class CodeHit:
+    code_type: str
+    code: str
+    line_no: int
+    context: str
+    cpt_hcpcs: Optional[str] = None
+
+@dataclass
+class RemitClaim:
+    claim_id: Optional[str]
+    hits: List[CodeHit] = field(default_factory=list)
+    text_lines: List[str] = field(default_factory=list)
+    service_codes: List[str] = field(default_factory=list)
+
+    @property
+    def carc(self) -> List[str]:
+        return list(dict.fromkeys(h.code for h in self.hits if h.code_type == "CARC"))
+
+    @property
+    def rarc(self) -> List[str]:
+        return list(dict.fromkeys(h.code for h in self.hits if h.code_type == "RARC"))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.text_lines)
+
+def _is_x12(head: str) -> bool:
+    return head.lstrip().startswith("ISA")
+
+def iter_remittance(path: str) -> Iterator[RemitClaim]:
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        head = f.read(512)
+        f.seek(0)
+        if _is_x12(head):
+            yield from _iter_x12(f, head)
+        else:
+            yield from _iter_text(f)
+
+def _iter_text(f: TextIO) -> Iterator[RemitClaim]:
+    current: Optional[RemitClaim] = None
+    # Text before the first "Claim:" line (bounded); kept in case the file has no claim markers at all
+    preamble: Deque[str] = deque(maxlen=PREAMBLE_LINES)
+    pre_service: List[str] = []
+    cpt: Optional[str] = None
+
+    for line_no, raw in enumerate(f, start=1):
+        line = raw.rstrip("\r\n")
+        m = _CLAIM_RE.match(line)
+        if m:
+            if current is not None:
+                yield current
+            current = RemitClaim(claim_id=m.group(1))
+            cpt = None
+        elif current is None and not (_CARC_RE.search(line) or _RARC_RE.search(line)):
+            preamble.append(line)
+            ms = _SERVICE_LINE_RE.search(line)
+            if ms:
+                cpt = ms.group(1)
+                pre_service.append(cpt)
+            continue
+        elif current is None:
+            # Codes before any "Claim:" marker: treat the file as a single unnamed claim
+            current = RemitClaim(claim_id=None, text_lines=list(preamble), service_codes=pre_service)
+
+        current.text_lines.append(line)
+        ms = _SERVICE_LINE_RE.search(line)
+        if ms:
+            cpt = ms.group(1)
+            current.service_codes.append(cpt)
+        for code in _CARC_RE.findall(line):
+            current.hits.append(CodeHit("CARC", code, line_no, line.strip(), cpt))
+        for code in _RARC_RE.findall(line):
+            current.hits.append(CodeHit("RARC", code, line_no, line.strip(), cpt))
+
+    if current is not None:
+        yield current
+
+def _x12_segments(f: TextIO, head: str) -> Iterator[str]:
+    # ISA is fixed width: element separator at offset 3, segment terminator at offset 105
+    isa = head.lstrip()
+    terminator = isa[105] if len(isa) > 105 else "~"
+    buf = ""
+    while True:
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            break
+        buf += chunk
+        parts = buf.split(terminator)
+        buf = parts.pop()
+        for seg in parts:
+            seg = seg.strip()
+            if seg:
+                yield seg
+    if buf.strip():
+        yield buf.strip()
+
+def _iter_x12(f: TextIO, head: str) -> Iterator[RemitClaim]:
+    isa = head.lstrip()
+    sep = isa[3]
+    component = isa[104] if len(isa) > 104 else ":"  # ISA16
+    current: Optional[RemitClaim] = None
+    cpt: Optional[str] = None
+
+    for seg_no, seg in enumerate(_x12_segments(f, head), start=1):
+        el = seg.split(sep)
+        tag = el[0]
+        if tag == "CLP":
+            if current is not None:
+                yield current
+            current = RemitClaim(claim_id=el[1] if len(el) > 1 else None)
+            cpt = None
+        elif tag in ("SE", "GE", "IEA", "PLB"):
+            # End of the claim loops for this transaction
+            if current is not None:
+                yield current
+                current = None
+            continue
+        if current is None:
+            continue
+
+        current.text_lines.append(seg)
+        if tag == "SVC" and len(el) > 1:
+            # SVC01 is a composite such as HC:99213:25; the sub-element separator is ISA16
+            comp = el[1].split(component)
+            cpt = comp[1] if len(comp) > 1 else comp[0]
+            current.service_codes.append(cpt)
+        elif tag == "CAS":
+            # CAS*<group>*<reason>*<amount>*<qty>*<reason>*<amount>*<qty>...
+            for i in range(2, len(el), 3):
+                if el[i]:
+                    current.hits.append(CodeHit("CARC", el[i], seg_no, seg, cpt))
+        elif tag == "LQ" and len(el) > 2 and el[1] == "HE":
+            current.hits.append(CodeHit("RARC", el[2], seg_no, seg, cpt))
+        elif tag in ("MOA", "MIA"):
+            # Claim-level remark codes: MOA03-07, MIA05 / MIA20-24
+            idx = range(3, 8) if tag == "MOA" else (5, 20, 21, 22, 23, 24)
+            for i in idx:
+                if i < len(el) and re.fullmatch(r"[A-Z]{1,2}\d+", el[i]):
+                    current.hits.append(CodeHit("RARC", el[i], seg_no, seg, None))
+
+    if current is not None:
+        yield current
+
+def process_remittance(path: str, codebook: Codebook, plan: bool = False,
+                       planner: Optional[DenialPlanner] = None) -> Iterator[Dict[str, Any]]:
+    # With a planner, claims sharing a CARC/RARC signature share one LLM-built plan template
+    for claim in iter_remittance(path):
+        carc, rarc = claim.carc, claim.rarc
+        meanings = codebook.lookup(carc, rarc)
+        out: Dict[str, Any] = {
+            "claim_id": claim.claim_id,
+            "service_codes": claim.service_codes,
+            "carc": carc,
+            "rarc": rarc,
+            "meanings": meanings,
+            "codes": [
+                {"type": h.code_type, "code": h.code, "line_no": h.line_no, "cpt_hcpcs": h.cpt_hcpcs, "context": h.context}
+                for h in claim.hits
+            ],
+        }
+        if plan and (carc or rarc):
+            if planner is not None:
+                out["plan"] = planner.plan(claim.claim_id, carc, rarc, claim.service_codes).model_dump()
+            else:
+                out["plan"] = build_denial_plan(claim.text, meanings).model_dump()
+        yield out
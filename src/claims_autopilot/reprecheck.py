@@ -0,0 +1,250 @@
+from __future__ import annotations
+import json, os, time
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from .utils import get_path
+from .validator import compile_rules, validate, with_issues
+from .duplicates import DUPLICATE_ISSUES
+from .questioner import questions_from_issues
+
+# Incremental re-precheck of stored precheck-batch results after a rules.yml edit.
+# Only checks that differ between the old and new rules can change a claim's issues, and each
+# check can only fire for claims with a given field missing (or a given CPT code billed), so
+# an index from field path / CPT code -> result lines picks out the rows that need validate() again.
+# precheck-batch / precheck-sharded write that index next to the results (<stem>.index.json), so a
+# re-precheck only parses the affected rows; it is rebuilt in one pass if missing or out of date.
+
+def _is_empty(val: Any) -> bool:
+    return val is None or val == "" or val == []
+
+def _check_keys(rules: Dict[str, Any]) -> List[Tuple]:
+    # Everything validate() reads from rules.yml, one hashable key per check, in evaluation order
+    keys: List[Tuple] = []
+    for rf in rules.get("required_fields", []):
+        keys.append(("required", rf))
+    for chk in rules.get("basic_checks", []):
+        if chk.get("type") == "min_list_len":
+            keys.append(("min_list_len", chk.get("path", ""), int(chk.get("min", 1)), chk.get("message", "Check failed")))
+    for chk in rules.get("conditional_checks", []):
+        if chk.get("type") == "requires_field_for_codes":
+            codes = frozenset(str(x).strip() for x in (chk.get("codes") or []))
+            keys.append(("codes", chk.get("field", ""), codes, chk.get("message") or "Missing field for codes"))
+    return keys
+
+@dataclass
+class RuleDiff:
+    rerun_all: bool = False
+    missing_paths: Set[str] = field(default_factory=set)  # claims missing one of these may change
+    list_paths: Dict[str, int] = field(default_factory=dict)  # path -> largest min; shorter lists may change
+    code_fields: List[Tuple[frozenset, str]] = field(default_factory=list)  # (codes, field) pairs
+
+    @property
+    def unchanged(self) -> bool:
+        return not (self.rerun_all or self.missing_paths or self.list_paths or self.code_fields)
+
+def diff_rules(old: Dict[str, Any], new: Dict[str, Any]) -> RuleDiff:
+    old_keys, new_keys = _check_keys(old), _check_keys(new)
+    diff = RuleDiff()
+    old_count, new_count = Counter(old_keys), Counter(new_keys)
+    # Issues come out in rule order, so moving checks that survive the edit can reorder any claim's issues
+    if [k for k in old_keys if k in new_count] != [k for k in new_keys if k in old_count]:
+        diff.rerun_all = True
+        return diff
+    for key in (old_count - new_count) + (new_count - old_count):
+        if key[0] == "required":
+            diff.missing_paths.add(key[1])
+        elif key[0] == "min_list_len":
+            diff.list_paths[key[1]] = max(diff.list_paths.get(key[1], 0), key[2])
+        else:
+            diff.code_fields.append((key[2], key[1]))
+    return diff
+
+def rule_paths(rules: Dict[str, Any]) -> Set[str]:
+    # Field paths the rules.yml checks read; batches index these next to their results
+    return {key[1] for key in _check_keys(rules)}
+
+def index_entry(packet: Dict[str, Any], paths: List[str]) -> Tuple[List[Tuple[bool, int]], List[str]]:
+    # Per path (in order): (empty?, list length or -1), plus the distinct CPT/HCPCS codes billed
+    fields = []
+    for p in paths:
+        val = get_path(packet, p)
+        fields.append((_is_empty(val), len(val) if isinstance(val, list) else -1))
+    codes = set()
+    for ln in get_path(packet, "claim.lines") or []:
+        c = ln.get("cpt_hcpcs") if isinstance(ln, dict) else None
+        if c:
+            codes.add(str(c).strip())
+    return fields, sorted(codes)
+
+class ClaimIndex:
+    """Field path -> result lines with that field empty, and CPT code -> result lines billing it."""
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self.paths = sorted(set(paths))
+        self.lines = array("q")  # line number of every ok row in the results file
+        self.list_len: Dict[str, array] = {p: array("q") for p in self.paths}  # parallel to lines
+        self.missing: Dict[str, array] = {p: array("q") for p in self.paths}
+        self.by_code: Dict[str, array] = defaultdict(lambda: array("q"))
+        self.risk_counts: Counter = Counter()
+
+    def add(self, line: int, packet: Dict[str, Any], risk: str) -> None:
+        self.add_entry(line, index_entry(packet, self.paths), risk)
+
+    def add_entry(self, line: int, entry: Tuple[List[Tuple[bool, int]], List[str]], risk: str) -> None:
+        fields, codes = entry
+        self.lines.append(line)
+        self.risk_counts[risk] += 1
+        for p, (empty, n) in zip(self.paths, fields):
+            if empty:
+                self.missing[p].append(line)
+            self.list_len[p].append(n)
+        for c in codes:
+            self.by_code[c].append(line)
+
+    def covers(self, diff: RuleDiff) -> bool:
+        needed = set(diff.missing_paths) | set(diff.list_paths) | {fld for _, fld in diff.code_fields}
+        return needed <= set(self.paths)
+
+    def affected(self, diff: RuleDiff) -> Set[int]:
+        if diff.rerun_all:
+            return set(self.lines)
+        out: Set[int] = set()
+        for p in diff.missing_paths:
+            out.update(self.missing[p])
+        for p, min_len in diff.list_paths.items():
+            out.update(i for i, n in zip(self.lines, self.list_len[p]) if n < min_len)
+        for codes, fld in diff.code_fields:
+            billed = set().union(*(self.by_code.get(c, ()) for c in codes))
+            out |= billed.intersection(self.missing[fld])
+        return out
+
+    @classmethod
+    def scan(cls, results: Path, paths: Iterable[str]) -> "ClaimIndex":
+        index = cls(paths)
+        with open(results, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                row = json.loads(line) if line.strip() else None
+                if row and row.get("status") == "ok" and isinstance(row.get("packet"), dict):
+                    index.add(i, row["packet"], row.get("risk"))
+        return index
+
+    def save(self, path: Path, results: Path) -> None:
+        st = results.stat()
+        _atomic_write(path, json.dumps({
+            "results_size": st.st_size,
+            "results_mtime_ns": st.st_mtime_ns,
+            "paths": self.paths,
+            "lines": self.lines.tolist(),
+            "list_len": {p: a.tolist() for p, a in self.list_len.items()},
+            "missing": {p: a.tolist() for p, a in self.missing.items()},
+            "by_code": {c: a.tolist() for c, a in self.by_code.items()},
+            "risk_counts": dict(self.risk_counts),
+        }))
+
+    @classmethod
+    def load(cls, path: Path, results: Path) -> Optional["ClaimIndex"]:
+        # None when there is no index or it was written for another version of the results file
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        st = results.stat()
+        if (data.get("results_size"), data.get("results_mtime_ns")) != (st.st_size, st.st_mtime_ns):
+            return None
+        index = cls(data["paths"])
+        index.lines = array("q", data["lines"])
+        index.list_len = {p: array("q", v) for p, v in data["list_len"].items()}
+        index.missing = {p: array("q", v) for p, v in data["missing"].items()}
+        index.by_code.update((c, array("q", v)) for c, v in data["by_code"].items())
+        index.risk_counts.update(data["risk_counts"])
+        return index
+
+def rules_snapshot_path(results_path: str) -> Path:
+    p = Path(results_path)
+    return p.with_name(p.stem + ".rules.json")
+
+def index_path(results_path: str) -> Path:
+    p = Path(results_path)
+    return p.with_name(p.stem + ".index.json")
+
+def reprecheck_results(results_path: str, new_rules: Dict[str, Any],
+                       old_rules: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    snapshot = rules_snapshot_path(results_path)
+    if old_rules is None:
+        if not snapshot.exists():
+            raise FileNotFoundError(f"No rules snapshot at {snapshot}; pass the previous rules explicitly")
+        old_rules = json.loads(snapshot.read_text(encoding="utf-8"))
+    diff = diff_rules(old_rules, new_rules)
+    if diff.unchanged:
+        # Only check names (or nothing validate() reads) changed: no stored result can differ
+        _atomic_write(snapshot, json.dumps(new_rules, indent=2))
+        return {"results": results_path, "rerun_all": False, "re_evaluated": 0, "changed": 0,
+                "elapsed_s": round(time.perf_counter() - t0, 3)}
+
+    results = Path(results_path)
+    index = ClaimIndex.load(index_path(results_path), results)
+    rebuilt = index is None or not index.covers(diff)
+    if rebuilt:
+        # No index from the batch, the results changed since, or a check reads a field it doesn't track
+        paths = rule_paths(old_rules) | rule_paths(new_rules) | set(index.paths if index else ())
+        index = ClaimIndex.scan(results, paths)
+    affected = index.affected(diff)
+
+    compiled = compile_rules(new_rules)
+    changed = 0
+    if affected:
+        # One streaming pass: affected rows are re-validated, all others copied byte for byte
+        tmp = results.with_name(results.name + ".tmp")
+        with open(results, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+            for i, line in enumerate(src):
+                if i in affected:
+                    row = json.loads(line)
+                    # Duplicate flags don't come from rules.yml; keep them as found at precheck time
+                    kept = [it for it in row.get("issues") or [] if it.get("type") in DUPLICATE_ISSUES]
+                    report = with_issues(validate(row["packet"], compiled), kept)
+                    if report["risk"] != row.get("risk") or report["issues"] != row.get("issues"):
+                        index.risk_counts[row.get("risk")] -= 1
+                        index.risk_counts[report["risk"]] += 1
+                        row.update(risk=report["risk"], issues=report["issues"],
+                                   questions=questions_from_issues(report["issues"]))
+                        line = json.dumps(row) + "\n"
+                        changed += 1
+                dst.write(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if changed:
+            os.replace(tmp, results)
+        else:
+            os.unlink(tmp)
+    if changed or rebuilt:
+        index.save(index_path(results_path), results)
+    _atomic_write(snapshot, json.dumps(new_rules, indent=2))
+
+    risk_counts = index.risk_counts
+    summary = {
+        "results": results_path,
+        "claims": len(index.lines),
+        "rerun_all": diff.rerun_all,
+        "re_evaluated": len(affected),
+        "changed": changed,
+        "skipped": len(index.lines) - len(affected),
+        "risk_counts": {k: risk_counts.get(k, 0) for k in ("LOW", "MEDIUM", "HIGH")},
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
+    summary_path = Path(results_path).with_name(Path(results_path).stem + ".summary.json")
+    if summary_path.exists():
+        stored = json.loads(summary_path.read_text(encoding="utf-8"))
+        stored["risk_counts"] = summary["risk_counts"]
+        _atomic_write(summary_path, json.dumps(stored, indent=2))
+    return summary
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import os, sys, threading, time
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+# Process-wide cache of parsed data files (rules.yml, the CARC/RARC codebook, ...).
+# Entries are keyed on (kind, absolute path) and checked against the file's mtime + size on
+# every get(), so editing a file is picked up on the next call without restarting the app.
+
+T = TypeVar("T")
+
+class FileResourceCache:
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+
+    def get(self, kind: str, path: str, loader: Callable[[str], T]) -> T:
+        key = (kind, os.path.abspath(path))
+        st = os.stat(key[1])
+        version = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                entry["hits"] += 1
+                self.hits += 1
+                return entry["value"]
+
+        t0 = time.perf_counter()
+        value = loader(key[1])
+        load_ms = (time.perf_counter() - t0) * 1000
+
+        with self._lock:
+            old = self._entries.get(key)
+            self.loads += 1
+            if old is not None:
+                self.reloads += 1
+            self._entries[key] = {
+                "value": value,
+                "version": version,
+                "hits": old["hits"] if old else 0,
+                "loads": (old["loads"] if old else 0) + 1,
+                "last_load_ms": round(load_ms, 3),
+                "loaded_at": time.time(),
+            }
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files = [
+                {
+                    "kind": kind,
+                    "path": path,
+                    "hits": e["hits"],
+                    "loads": e["loads"],
+                    "last_load_ms": e["last_load_ms"],
+                    "mtime_ns": e["version"][0],
+                }
+                for (kind, path), e in self._entries.items()
+            ]
+            return {"hits": self.hits, "loads": self.loads, "reloads": self.reloads, "files": files}
+
+def _new_cache() -> FileResourceCache:
+    return FileResourceCache()
+
+def _shared_cache() -> FileResourceCache:
+    # Under `streamlit run`, hold the cache in st.cache_resource so every session (and a re-import
+    # of this module after a code edit) shares one instance for the server process
+    if "streamlit" in sys.modules:
+        try:
+            import streamlit as st
+            from streamlit import runtime
+            if runtime.exists():
+                return st.cache_resource(show_spinner=False)(_new_cache)()
+        except Exception:
+            pass
+    return _new_cache()
+
+RESOURCES = _shared_cache()
+
+def resource_stats() -> Dict[str, Any]:
+    return RESOURCES.stats()
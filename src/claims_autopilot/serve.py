@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json, os, signal, socketserver, stat, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Optional
+from .profiling import METRICS
+
+# Persistent worker for `cli serve`: imports, rules.yml and the codebook are loaded once,
+# then each JSONL request line gets one JSON reply line:
+#   {"id": 1, "cmd": "precheck", "text": "...", "extraction_policy": "regex-only"}
+#   -> {"id": 1, "ok": true, "result": {"risk": ..., "issues": [...], "questions": [...]}}
+# Rules and codebook go through resources.RESOURCES, so edits on disk are picked up per request.
+
+class RequestError(ValueError):
+    pass
+
+def _request_text(req: Dict[str, Any]) -> str:
+    if isinstance(req.get("text"), str):
+        return req["text"]
+    if req.get("text_file"):
+        return Path(req["text_file"]).read_text(encoding="utf-8")
+    raise RequestError("request needs 'text' or 'text_file'")
+
+class Server:
+    def __init__(self, rules_path: str = "data/rules.yml", codebook_path: str = "data/carc_rarc_subset.csv"):
+        t0 = time.perf_counter()
+        from .extractor import extract_claim_from_text
+        from .validator import load_rules_cached, load_compiled_rules, validate
+        from .questioner import questions_from_issues
+        from .denial import extract_codes, load_codebook_index, lookup_meanings, build_denial_plan
+        self.rules_path = rules_path
+        self.codebook_path = codebook_path
+        self._extract = extract_claim_from_text
+        self._rules = lambda: load_rules_cached(rules_path)
+        self._compiled = lambda: load_compiled_rules(rules_path)
+        self._validate = validate
+        self._questions = questions_from_issues
+        self._codes = extract_codes
+        self._codebook = lambda: load_codebook_index(codebook_path)
+        self._meanings = lookup_meanings
+        self._plan = build_denial_plan
+        self._rules()
+        self._compiled()
+        self._codebook()
+        self.started = time.time()
+        self.warmup_ms = round((time.perf_counter() - t0) * 1000, 1)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "precheck": self.precheck,
+            "denial": self.denial,
+            "ping": lambda req: {"pong": True},
+            "stats": lambda req: self.stats(),
+        }
+
+    def precheck(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        packet = self._extract(_request_text(req), policy=req.get("extraction_policy"), rules=self._rules())
+        packet_dict = packet.model_dump()
+        report = self._validate(packet_dict, self._compiled())
+        out = {"risk": report["risk"], "issues": report["issues"], "questions": self._questions(report["issues"])}
+        if req.get("include_packet"):
+            out["packet"] = packet_dict
+        if req.get("export"):
+            from .generator import export_outputs
+            out["exports"] = export_outputs(packet_dict, out_dir=req.get("export_dir", "outputs"))
+        return out
+
+    def denial(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        txt = _request_text(req)
+        carc, rarc = self._codes(txt)
+        meanings = self._meanings(self._codebook(), carc, rarc)
+        if not req.get("plan", True):
+            return {"carc": carc, "rarc": rarc, "meanings": meanings}
+        return self._plan(txt, meanings).model_dump()
+
+    def stats(self) -> Dict[str, Any]:
+        from .resources import resource_stats
+        from .llm import cache_stats
+        with self._lock:
+            counts = {"requests": self.requests, "errors": self.errors}
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "warmup_ms": self.warmup_ms,
+            **counts,
+            "resources": resource_stats(),
+            "llm_cache": cache_stats(),
+            "metrics": METRICS.snapshot() if METRICS.enabled else None,
+        }
+
+    def handle(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        rid = req.get("id") if isinstance(req, dict) else None
+        try:
+            if not isinstance(req, dict):
+                raise RequestError("request must be a JSON object")
+            handler = self.handlers.get(req.get("cmd", "precheck"))
+            if handler is None:
+                raise RequestError(f"unknown cmd {req.get('cmd')!r}; expected one of {sorted(self.handlers)}")
+            result = handler(req)
+            ok = True
+        except Exception as e:
+            result, ok = None, False
+            err = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+        return {"id": rid, "ok": True, "result": result} if ok else {"id": rid, "ok": False, "error": err}
+
+    def handle_line(self, line: str) -> Optional[str]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError as e:
+            with self._lock:
+                self.requests += 1
+                self.errors += 1
+            return json.dumps({"id": None, "ok": False, "error": f"invalid JSON: {e}"})
+        return json.dumps(self.handle(req), default=str)
+
+    def serve_stdio(self, stdin: IO[str], stdout: IO[str]) -> None:
+        for line in stdin:
+            reply = self.handle_line(line)
+            if reply is not None:
+                stdout.write(reply + "\n")
+                stdout.flush()
+
+    def serve_unix(self, path: str) -> None:
+        # One thread per connection; each connection is its own JSONL request/reply stream
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    reply = server.handle_line(raw.decode("utf-8"))
+                    if reply is not None:
+                        self.wfile.write(reply.encode("utf-8") + b"\n")
+                        self.wfile.flush()
+
+        if os.path.lexists(path):
+            # Only replace a stale socket from an earlier run, never a file given by mistake
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise FileExistsError(f"{path} exists and is not a socket; refusing to replace it")
+            os.unlink(path)
+        with socketserver.ThreadingUnixStreamServer(path, _Handler) as srv:
+            srv.daemon_threads = True
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=srv.shutdown).start())
+            try:
+                srv.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.unlink(path)
@@ -0,0 +1,367 @@
+from __future__ import annotations
+import asyncio, json, time
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .config import EXTRACTION_POLICIES
+from .profiling import METRICS, Metrics
+
+# Asyncio HTTP front end for calling precheck / denial from other systems (stdlib only:
+# HTTP/1.1 with keep-alive, JSON request and response bodies).
+#   POST /precheck        {"text": "...", "extraction_policy": "regex-first"} -> {"risk", "issues", "questions"}
+#   POST /precheck/batch  {"claims": [{"id": ..., "text": "..."}, ...]}     -> {"results": [{"id", "ok", ...}]}
+#   POST /denial          {"text": "...", "plan": true}                      -> DenialPlan (or codes + meanings)
+#   GET  /healthz, GET /metrics
+# Concurrent /precheck and /denial requests are collected for up to `window_ms` (or `max_batch` items) and run
+# as one batch, where identical texts share a single extraction / plan. Once `max_queue` claims are queued or
+# in flight, new requests get 503 with Retry-After instead of piling up.
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+class MicroBatcher:
+    """Collects submitted items for up to `window_ms` and hands them to `process` as one list."""
+
+    def __init__(self, name: str, process: Callable[[List[Any]], Awaitable[List[Any]]], metrics: Metrics,
+                 window_ms: float = 5.0, max_batch: int = 64):
+        self.name = name
+        self.process = process
+        self.metrics = metrics
+        self.window_s = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    async def submit(self, item: Any) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, fut))
+        return await fut
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window_s
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.incr(f"{self.name}.batches")
+            self.metrics.incr(f"{self.name}.batched_items", len(batch))
+            # Keep collecting the next batch while this one waits on the LLM
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, fut), res in zip(batch, results):
+            if fut.done():  # caller went away
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+class Service:
+    def __init__(self, rules_path: str = "data/rules.yml", codebook_path: str = "data/carc_rarc_subset.csv",
+                 window_ms: float = 5.0, max_batch: int = 64, max_queue: int = 1000, max_body: int = 10 * 1024 * 1024):
+        t0 = time.perf_counter()
+        from .extractor import aextract_claim_from_text
+        from .validator import load_rules_cached, load_compiled_rules, validate
+        from .questioner import questions_from_issues
+        from .denial import extract_codes, load_codebook_index, lookup_meanings, abuild_denial_plan
+        self._extract = aextract_claim_from_text
+        self._rules = lambda: load_rules_cached(rules_path)
+        self._compiled = lambda: load_compiled_rules(rules_path)
+        self._validate = validate
+        self._questions = questions_from_issues
+        self._codes = extract_codes
+        self._codebook = lambda: load_codebook_index(codebook_path)
+        self._meanings = lookup_meanings
+        self._plan = abuild_denial_plan
+        # Parse rules.yml and the codebook now rather than on the first request
+        self._rules()
+        self._compiled()
+        self._codebook()
+        self.warmup_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.pending = 0
+        self.started = time.time()
+        self.metrics = Metrics()
+        self.metrics.enabled = True
+        self.precheck_batcher = MicroBatcher("precheck", self._precheck_many, self.metrics, window_ms, max_batch)
+        self.denial_batcher = MicroBatcher("denial", self._denial_many, self.metrics, window_ms, max_batch)
+        self.routes: Dict[str, Dict[str, Callable[[Any], Awaitable[Any]]]] = {
+            "/precheck": {"POST": self.precheck},
+            "/precheck/batch": {"POST": self.precheck_batch},
+            "/denial": {"POST": self.denial},
+            "/healthz": {"GET": self.healthz},
+            "/metrics": {"GET": self.metrics_view},
+        }
+
+    async def start(self) -> None:
+        self.precheck_batcher.start()
+        self.denial_batcher.start()
+
+    async def stop(self) -> None:
+        await self.precheck_batcher.stop()
+        await self.denial_batcher.stop()
+
+    # --- batch processing -------------------------------------------------
+
+    async def _precheck_many(self, reqs: List[Dict[str, Any]]) -> List[Any]:
+        rules, compiled = self._rules(), self._compiled()
+        keys = [(r["text"], r.get("extraction_policy")) for r in reqs]
+        unique = list(dict.fromkeys(keys))
+        self.metrics.incr("precheck.deduplicated", len(keys) - len(unique))
+        packets = await asyncio.gather(*(self._extract(t, policy=p, rules=rules) for t, p in unique),
+                                       return_exceptions=True)
+        by_key = dict(zip(unique, packets))
+        # Validation is CPU-bound: one worker-thread hop per micro-batch keeps accept/read and backpressure live
+        return await asyncio.to_thread(self._report_many, reqs, keys, by_key, compiled)
+
+    def _report_many(self, reqs: List[Dict[str, Any]], keys: List[Tuple[str, Any]], by_key: Dict[Tuple[str, Any], Any],
+                     compiled: Any) -> List[Any]:
+        out: List[Any] = []
+        for r, key in zip(reqs, keys):
+            packet = by_key[key]
+            if isinstance(packet, BaseException):
+                out.append(packet)
+                continue
+            packet_dict = packet.model_dump()
+            report = self._validate(packet_dict, compiled)
+            res = {"risk": report["risk"], "issues": report["issues"], "questions": self._questions(report["issues"])}
+            if r.get("include_packet"):
+                res["packet"] = packet_dict
+            out.append(res)
+        return out
+
+    async def _denial_many(self, reqs: List[Dict[str, Any]]) -> List[Any]:
+        looked_up = await asyncio.to_thread(self._lookup_many, reqs)
+        texts = list(dict.fromkeys(r["text"] for r in reqs if r.get("plan", True)))
+        self.metrics.incr("denial.deduplicated", sum(bool(r.get("plan", True)) for r in reqs) - len(texts))
+        meanings_for = {r["text"]: m for r, (_, _, m) in zip(reqs, looked_up)}
+        plans = await asyncio.gather(*(self._plan(t, meanings_for[t]) for t in texts), return_exceptions=True)
+        by_text = dict(zip(texts, plans))
+        out: List[Any] = []
+        for r, (carc, rarc, meanings) in zip(reqs, looked_up):
+            if not r.get("plan", True):
+                out.append({"carc": carc, "rarc": rarc, "meanings": meanings})
+                continue
+            plan = by_text[r["text"]]
+            out.append(plan if isinstance(plan, BaseException) else plan.model_dump())
+        return out
+
+    def _lookup_many(self, reqs: List[Dict[str, Any]]) -> List[Tuple[List[str], List[str], Any]]:
+        codebook = self._codebook()
+        looked_up = []
+        for r in reqs:
+            carc, rarc = self._codes(r["text"])
+            looked_up.append((carc, rarc, self._meanings(codebook, carc, rarc)))
+        return looked_up
+
+    # --- endpoints --------------------------------------------------------
+
+    def _admit(self, n: int) -> None:
+        if self.pending + n > self.max_queue:
+            self.metrics.incr("rejected")
+            raise HTTPError(503, f"queue full ({self.pending} claims pending, limit {self.max_queue})")
+        self.pending += n
+
+    def _claim_request(self, body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict) or not isinstance(body.get("text"), str):
+            raise HTTPError(400, "body must be a JSON object with a 'text' string")
+        policy = body.get("extraction_policy")
+        if policy is not None and policy not in EXTRACTION_POLICIES:
+            raise HTTPError(400, f"unknown extraction_policy {policy!r}; expected one of {list(EXTRACTION_POLICIES)}")
+        return body
+
+    async def precheck(self, body: Any) -> Any:
+        req = self._claim_request(body)
+        self._admit(1)
+        try:
+            return await self.precheck_batcher.submit(req)
+        finally:
+            self.pending -= 1
+
+    async def precheck_batch(self, body: Any) -> Any:
+        claims = body.get("claims") if isinstance(body, dict) else None
+        if not isinstance(claims, list):
+            raise HTTPError(400, "body must be a JSON object with a 'claims' list")
+        reqs = [self._claim_request(c) for c in claims]
+        self._admit(len(reqs))
+        try:
+            results = await self._precheck_many(reqs)
+        finally:
+            self.pending -= len(reqs)
+        rows = []
+        for req, res in zip(reqs, results):
+            if isinstance(res, BaseException):
+                rows.append({"id": req.get("id"), "ok": False, "error": f"{type(res).__name__}: {res}"})
+            else:
+                rows.append({"id": req.get("id"), "ok": True, **res})
+        return {"results": rows}
+
+    async def denial(self, body: Any) -> Any:
+        if not isinstance(body, dict) or not isinstance(body.get("text"), str):
+            raise HTTPError(400, "body must be a JSON object with a 'text' string")
+        self._admit(1)
+        try:
+            return await self.denial_batcher.submit(body)
+        finally:
+            self.pending -= 1
+
+    async def healthz(self, body: Any) -> Any:
+        return {"status": "ok", "uptime_s": round(time.time() - self.started, 3), "pending": self.pending}
+
+    async def metrics_view(self, body: Any) -> Any:
+        from .resources import resource_stats
+        from .llm import cache_stats
+        snap = self.metrics.snapshot()
+        counters = snap["counters"]
+        batches = {}
+        for name in ("precheck", "denial"):
+            n = counters.get(f"{name}.batches", 0)
+            batches[name] = {"batches": n, "mean_size": round(counters.get(f"{name}.batched_items", 0) / n, 2) if n else None}
+        return {
+            "uptime_s": round(time.time() - self.started, 3),
+            "warmup_ms": self.warmup_ms,
+            "pending": self.pending,
+            "max_queue": self.max_queue,
+            "batching": batches,
+            "http": snap["stages"],
+            "counters": counters,
+            "pipeline": METRICS.snapshot() if METRICS.enabled else None,
+            "resources": resource_stats(),
+            "llm_cache": cache_stats(),
+        }
+
+    # --- HTTP -------------------------------------------------------------
+
+    async def dispatch(self, method: str, path: str, raw: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        methods = self.routes.get(path)
+        if methods is None:
+            return 404, {"error": f"no route {path}"}, {}
+        handler = methods.get(method)
+        if handler is None:
+            return 405, {"error": f"{method} not allowed on {path}"}, {"Allow": ", ".join(methods)}
+        t0 = time.perf_counter()
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError as e:
+            status, payload, headers = 400, {"error": f"invalid JSON: {e}"}, {}
+        else:
+            try:
+                status, payload, headers = 200, await handler(body), {}
+            except HTTPError as e:
+                status, payload = e.status, {"error": str(e)}
+                headers = {"Retry-After": "1"} if e.status == 503 else {}
+            except Exception as e:
+                status, payload, headers = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+        self.metrics.record(f"{method} {path}", (time.perf_counter() - t0) * 1000)
+        self.metrics.incr(f"status.{status}")
+        return status, payload, headers
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "headers too large"}, False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split(" ")
+                if len(parts) != 3:
+                    await self._send(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                method, target, version = parts
+                headers = {}
+                for ln in lines[1:]:
+                    if ":" in ln:
+                        k, v = ln.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                if "transfer-encoding" in headers:
+                    await self._send(writer, 411, {"error": "send a Content-Length body"}, False)
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "bad Content-Length"}, False)
+                    break
+                if length > self.max_body:
+                    await self._send(writer, 413, {"error": f"body over {self.max_body} bytes"}, False)
+                    break
+                if length and headers.get("expect", "").lower() == "100-continue":
+                    # curl sends this for bodies over 1 KB and waits ~1 s for the go-ahead otherwise
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+                raw = await reader.readexactly(length) if length else b""
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn == "keep-alive" if version == "HTTP/1.0" else conn != "close"
+                status, payload, extra = await self.dispatch(method, target.split("?", 1)[0], raw)
+                await self._send(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool,
+                    extra: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+async def serve_http(host: str = "127.0.0.1", port: int = 8080, **kwargs: Any) -> None:
+    service = Service(**kwargs)
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    addr = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"claims-autopilot listening on {addr} (warm-up {service.warmup_ms} ms)", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+def run(host: str = "127.0.0.1", port: int = 8080, **kwargs: Any) -> None:
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve_http(host, port, **kwargs))
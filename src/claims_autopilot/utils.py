@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Any, Dict
+import os
+from typing import Any, Dict, Optional
 
 def get_path(d: Dict[str, Any], path: str) -> Any:
     cur: Any = d
@@ -10,6 +11,12 @@ def get_path(d: Dict[str, Any], path: str) -> Any:
             return None
     return cur
 
+def claim_key(path: Any, packet: Optional[Dict[str, Any]] = None) -> str:
+    # Identity of a prechecked claim: the packet's claim ID if it has one, else the absolute input
+    # path (file stems collide across directories, e.g. a/claim.txt and b/claim.txt)
+    claim_id = get_path(packet or {}, "meta.claim_id")
+    return str(claim_id) if claim_id not in (None, "") else os.path.abspath(str(path))
+
 def set_path(d: Dict[str, Any], path: str, value: Any) -> None:
     cur = d
     parts = path.split(".")
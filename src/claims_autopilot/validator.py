@@ -1,12 +1,23 @@
 from __future__ import annotations
-from typing import Dict, Any, List
-import yaml
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Callable, Optional, Tuple
 from .utils import get_path
+from .resources import RESOURCES
+from .profiling import timed
+from .compact import CompactClaim, make_compact_accessor
 
 def load_rules(path: str) -> Dict[str, Any]:
+    import yaml
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
+def load_rules_cached(path: str) -> Dict[str, Any]:
+    # Shared parsed copy, reloaded when the file changes; treat it as read-only
+    return RESOURCES.get("rules", path, load_rules)
+
+def load_compiled_rules(path: str) -> CompiledRules:
+    return RESOURCES.get("compiled_rules", path, lambda p: compile_rules(load_rules(p)))
+
 def _service_codes(packet_dict: Dict[str, Any]) -> List[str]:
     lines = get_path(packet_dict, "claim.lines") or []
     codes: List[str] = []
@@ -18,7 +29,28 @@ def _service_codes(packet_dict: Dict[str, Any]) -> List[str]:
                     codes.append(str(c).strip())
     return codes
 
-def validate(packet_dict: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Any]:
+HIGH_RISK_ISSUES = ("missing_required", "conditional_missing", "duplicate_claim")
+
+def _risk(issues: List[Dict[str, str]]) -> str:
+    if any(i["type"] in HIGH_RISK_ISSUES for i in issues):
+        return "HIGH"
+    return "MEDIUM" if issues else "LOW"
+
+def with_issues(report: Dict[str, Any], extra: List[Dict[str, str]]) -> Dict[str, Any]:
+    # Add issues found outside validate() (e.g. duplicates.DuplicateIndex) and re-derive the risk
+    if not extra:
+        return report
+    issues = report["issues"] + extra
+    return {"risk": _risk(issues), "issues": issues}
+
+@timed("validate")
+def validate(packet_dict: Dict[str, Any] | CompactClaim, rules: Dict[str, Any] | CompiledRules) -> Dict[str, Any]:
+    if isinstance(packet_dict, CompactClaim):
+        compiled = rules if isinstance(rules, CompiledRules) else compile_rules(rules)
+        return validate_compiled(packet_dict, compiled.for_compact())
+    if isinstance(rules, CompiledRules):
+        return validate_compiled(packet_dict, rules)
+
     issues: List[Dict[str, str]] = []
 
     for rf in rules.get("required_fields", []):
@@ -43,10 +75,132 @@ def validate(packet_dict: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, An
                     msg = (chk.get("message") or "Missing field for codes").format(codes=",".join(sorted(codes)))
                     issues.append({"type": "conditional_missing", "field": field, "message": msg})
 
-    risk = "LOW"
-    if any(i["type"] in ("missing_required", "conditional_missing") for i in issues):
-        risk = "HIGH"
-    elif issues:
-        risk = "MEDIUM"
+    return {"risk": _risk(issues), "issues": issues}
+
+# --- Compiled rules -------------------------------------------------------
+# compile_rules() resolves rules.yml once into prebound check callables so a large batch
+# does not re-dispatch on check types, re-split dotted paths or re-format messages per claim.
+
+Check = Callable[[Dict[str, Any]], Optional[Dict[str, str]]]
+
+@dataclass
+class CompiledRules:
+    checks: List[Check]  # required_fields + basic_checks, evaluated for every claim
+    conditional: List[Check]  # requires_field_for_codes, evaluated only when triggered
+    code_index: Dict[str, Tuple[int, ...]]  # CPT/HCPCS code -> positions in `conditional`
+    source: Dict[str, Any] = field(default_factory=dict)
+    compact: bool = False  # checks read CompactClaim slots instead of packet dicts
+    _compact_twin: Optional["CompiledRules"] = field(default=None, repr=False)
+
+    def for_compact(self) -> "CompiledRules":
+        if self.compact:
+            return self
+        if self._compact_twin is None:
+            self._compact_twin = compile_rules(self.source, compact=True)
+        return self._compact_twin
+
+def make_accessor(path: str) -> Callable[[Dict[str, Any]], Any]:
+    # Same semantics as utils.get_path, with the path split once
+    parts = tuple(path.split("."))
+    if len(parts) == 2:
+        a, b = parts
+
+        def get2(d: Dict[str, Any]) -> Any:
+            if isinstance(d, dict) and a in d:
+                cur = d[a]
+                if isinstance(cur, dict) and b in cur:
+                    return cur[b]
+            return None
+        return get2
+
+    def get(d: Dict[str, Any]) -> Any:
+        cur: Any = d
+        for part in parts:
+            if isinstance(cur, dict) and part in cur:
+                cur = cur[part]
+            else:
+                return None
+        return cur
+    return get
+
+def _missing_check(path: str, issue_type: str, message: str, accessor=make_accessor) -> Check:
+    get = accessor(path)
+
+    def check(packet_dict: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        val = get(packet_dict)
+        if val is None or val == "" or val == []:
+            return {"type": issue_type, "field": path, "message": message}
+        return None
+    return check
+
+def _min_list_len_check(path: str, min_len: int, message: str, accessor=make_accessor) -> Check:
+    get = accessor(path)
+
+    def check(packet_dict: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        val = get(packet_dict)
+        if not isinstance(val, list) or len(val) < min_len:
+            return {"type": "check_failed", "field": path, "message": message}
+        return None
+    return check
+
+_claim_lines = make_accessor("claim.lines")
+
+def compile_rules(rules: Dict[str, Any], compact: bool = False) -> CompiledRules:
+    accessor = make_compact_accessor if compact else make_accessor
+    checks: List[Check] = []
+    for rf in rules.get("required_fields", []):
+        checks.append(_missing_check(rf, "missing_required", f"Missing required field: {rf}", accessor))
+
+    for chk in rules.get("basic_checks", []):
+        if chk.get("type") == "min_list_len":
+            checks.append(_min_list_len_check(chk.get("path", ""), int(chk.get("min", 1)), chk.get("message", "Check failed"), accessor))
+
+    conditional: List[Check] = []
+    code_index: Dict[str, List[int]] = {}
+    for chk in rules.get("conditional_checks", []):
+        if chk.get("type") == "requires_field_for_codes":
+            codes = set(str(x).strip() for x in (chk.get("codes") or []))
+            if not codes:
+                continue
+            msg = (chk.get("message") or "Missing field for codes").format(codes=",".join(sorted(codes)))
+            for c in codes:
+                code_index.setdefault(c, []).append(len(conditional))
+            conditional.append(_missing_check(chk.get("field", ""), "conditional_missing", msg, accessor))
+
+    return CompiledRules(
+        checks=checks,
+        conditional=conditional,
+        code_index={c: tuple(ix) for c, ix in code_index.items()},
+        source=rules,
+        compact=compact,
+    )
+
+def _line_codes(packet: Dict[str, Any] | CompactClaim, compact: bool) -> List[Any]:
+    if compact:
+        return [ln.cpt_hcpcs for ln in packet.lines]
+    lines = _claim_lines(packet)
+    if isinstance(lines, list):
+        return [ln.get("cpt_hcpcs") for ln in lines if isinstance(ln, dict)]
+    return []
+
+def validate_compiled(packet_dict: Dict[str, Any] | CompactClaim, compiled: CompiledRules) -> Dict[str, Any]:
+    issues: List[Dict[str, str]] = []
+    for check in compiled.checks:
+        issue = check(packet_dict)
+        if issue is not None:
+            issues.append(issue)
+
+    code_index = compiled.code_index
+    if code_index:
+        triggered: set = set()
+        for c in _line_codes(packet_dict, compiled.compact):
+            if c:
+                ix = code_index.get(str(c).strip())
+                if ix:
+                    triggered.update(ix)
+        for i in sorted(triggered):
+            issue = compiled.conditional[i](packet_dict)
+            if issue is not None:
+                issues.append(issue)
 
-    return {"risk": risk, "issues": issues}
\ No newline at end of file
+    return {"risk": _risk(issues), "issues": issues}
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import csv, heapq, json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from .questioner import QUESTION_MAP
+from .utils import claim_key, get_path
+
+# Batch worklist of missing information, grouped the way front-desk staff answer it:
+# one row per (field, provider NPI, triggering CPT codes) with the claims it blocks, e.g.
+# "providers.referring_provider_id missing on 412 claims for NPI 1234567890 / CPT 71046".
+# An inverted index maps each group to its claim IDs and each claim to its open groups, so claims
+# can be added, re-prechecked or answered one at a time. Only blocked claims are held, as small
+# tuples of group numbers (no packets); answered claims are dropped and a group's entries are freed
+# (its number reused) with its last claim, so memory follows what is open, not what was ever seen.
+
+Group = Tuple[str, str, str, str]  # (field, issue type, NPI, CPT codes)
+
+GROUP_BY = ("npi", "codes")  # optional dimensions; field and issue type always group
+WORKLIST_COLUMNS = ["field", "issue_type", "npi", "codes", "question", "claims", "unblocks", "claim_ids"]
+
+def _code_triggers(rules: Optional[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    # field -> CPT/HCPCS codes that make it required (rules.yml conditional_checks)
+    triggers: Dict[str, Set[str]] = defaultdict(set)
+    for chk in (rules or {}).get("conditional_checks", []):
+        if chk.get("type") == "requires_field_for_codes":
+            triggers[chk.get("field", "")].update(str(x).strip() for x in (chk.get("codes") or []))
+    return triggers
+
+class Worklist:
+    def __init__(self, rules: Optional[Dict[str, Any]] = None, by: Iterable[str] = GROUP_BY):
+        self._triggers = _code_triggers(rules)
+        self._by = set(by)
+        unknown = self._by - set(GROUP_BY)
+        if unknown:
+            raise ValueError(f"Unknown worklist grouping: {', '.join(sorted(unknown))} (choose from {', '.join(GROUP_BY)})")
+        self._groups: List[Optional[Group]] = []
+        self._free: List[int] = []  # numbers of emptied groups, reused first
+        self._group_ids: Dict[Group, int] = {}
+        self._questions: Dict[int, str] = {}
+        self._claims: Dict[int, Set[str]] = defaultdict(set)  # group -> claim IDs
+        self._open: Dict[str, Tuple[int, ...]] = {}  # claim ID -> its open groups
+
+    def _group(self, key: Group, message: str) -> int:
+        gid = self._group_ids.get(key)
+        if gid is None:
+            if self._free:
+                gid = self._free.pop()
+                self._groups[gid] = key
+            else:
+                gid = len(self._groups)
+                self._groups.append(key)
+            self._group_ids[key] = gid
+            self._questions[gid] = QUESTION_MAP.get(key[0]) or message
+        return gid
+
+    def _keys(self, packet: Dict[str, Any], issues: List[Dict[str, str]]) -> Dict[Group, str]:
+        npi = ""
+        if "npi" in self._by:
+            npi = str(get_path(packet, "providers.rendering_npi") or get_path(packet, "providers.billing_npi") or "")
+        svc_codes = {str(ln.get("cpt_hcpcs") or "").strip() for ln in (get_path(packet, "claim.lines") or [])
+                     if isinstance(ln, dict)}
+        keys: Dict[Group, str] = {}
+        for it in issues:
+            field = it.get("field", "")
+            codes = ""
+            if "codes" in self._by and field in self._triggers:
+                codes = ",".join(sorted(svc_codes & self._triggers[field]))
+            keys.setdefault((field, it.get("type", ""), npi, codes), it.get("message", ""))
+        return keys
+
+    def add(self, claim_id: str, packet: Optional[Dict[str, Any]], issues: List[Dict[str, str]]) -> None:
+        # Replaces whatever was recorded for the claim before, so a re-prechecked claim just updates
+        self.resolve(claim_id)
+        if not issues:
+            return
+        gids = tuple(self._group(key, msg) for key, msg in self._keys(packet or {}, issues).items())
+        for gid in gids:
+            self._claims[gid].add(claim_id)
+        self._open[claim_id] = gids
+
+    def resolve(self, claim_id: str, field: Optional[str] = None) -> None:
+        # The claim was answered: one field, or all of it when field is None
+        gids = self._open.pop(claim_id, ())
+        keep = tuple(g for g in gids if field is not None and self._groups[g][0] != field)
+        for gid in gids:
+            if gid not in keep:
+                self._claims[gid].discard(claim_id)
+                if not self._claims[gid]:
+                    self._drop_group(gid)
+        if keep:
+            self._open[claim_id] = keep
+
+    def _drop_group(self, gid: int) -> None:
+        del self._claims[gid], self._questions[gid], self._group_ids[self._groups[gid]]
+        self._groups[gid] = None
+        self._free.append(gid)
+
+    def add_results(self, rows: Iterable[Dict[str, Any]]) -> int:
+        # precheck-batch / reprecheck result rows, streamed; later rows for a claim replace earlier ones
+        n = 0
+        for row in rows:
+            if row.get("status") != "ok":
+                continue
+            claim_id = row.get("claim_id") or claim_key(row["file"], row.get("packet"))
+            self.add(claim_id, row.get("packet"), row.get("issues") or [])
+            n += 1
+        return n
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def rows(self, max_ids: int = 20) -> List[Dict[str, Any]]:
+        # Sorted by how many claims answering the row would fully unblock, then by claims touched
+        out = []
+        for gid, claims in self._claims.items():
+            field, issue_type, npi, codes = self._groups[gid]
+            out.append({
+                "field": field,
+                "issue_type": issue_type,
+                "npi": npi,
+                "codes": codes,
+                "question": self._questions[gid],
+                "claims": len(claims),
+                "unblocks": sum(1 for c in claims if len(self._open[c]) == 1),
+                "claim_ids": heapq.nsmallest(max_ids, claims),
+            })
+        out.sort(key=lambda r: (-r["unblocks"], -r["claims"], r["field"], r["npi"], r["codes"]))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"blocked_claims": len(self._open), "groups": len(self._claims),
+                "open_items": sum(len(g) for g in self._open.values())}
+
+    def export(self, path: str, fmt: str = "auto", max_ids: int = 20) -> str:
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "auto":
+            fmt = "json" if out.suffix.lower() == ".json" else "csv"
+        rows = self.rows(max_ids)
+        if fmt == "json":
+            out.write_text(json.dumps({**self.stats(), "worklist": rows}, indent=2), encoding="utf-8")
+        else:
+            with open(out, "w", encoding="utf-8", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=WORKLIST_COLUMNS)
+                w.writeheader()
+                for r in rows:
+                    w.writerow({**r, "claim_ids": " ".join(r["claim_ids"])})
+        return str(out)
+
+def iter_results(paths: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    for p in paths:
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
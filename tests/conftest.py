@@ -0,0 +1,30 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+os.environ.setdefault("LLM_BACKEND", "fake")  # nothing under tests/ may reach a real API
+os.environ.setdefault("LLM_CACHE", "0")
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data"
+
+@pytest.fixture
+def rules() -> Dict[str, Any]:
+    from claims_autopilot.validator import load_rules
+    return load_rules(str(DATA / "rules.yml"))
+
+@pytest.fixture
+def superbill() -> str:
+    return (DATA / "sample_superbill.txt").read_text(encoding="utf-8")
+
+def write_superbills(folder: Path, texts: List[str]) -> List[Path]:
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, txt in enumerate(texts):
+        p = folder / f"claim{i:03d}.txt"
+        p.write_text(txt, encoding="utf-8")
+        paths.append(p)
+    return paths
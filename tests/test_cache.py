@@ -0,0 +1,32 @@
+from __future__ import annotations
+import time
+
+from claims_autopilot.cache import ResponseCache
+
+def _accessed_at(cache: ResponseCache, key: str) -> float:
+    return cache._db().execute("SELECT accessed_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+def test_disk_hits_only_touch_stale_access_times(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), memory_entries=0)
+    cache.put("k", {"a": 1})
+    stored = _accessed_at(cache, "k")
+    writes = cache._db().total_changes
+    for _ in range(5):
+        assert cache.get("k") == {"a": 1}
+    assert cache._db().total_changes == writes and _accessed_at(cache, "k") == stored
+
+    old = time.time() - 2 * ResponseCache.TOUCH_AFTER_S
+    cache._db().execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (old, "k"))
+    assert cache.get("k") == {"a": 1}
+    assert _accessed_at(cache, "k") > old + ResponseCache.TOUCH_AFTER_S
+    assert cache.stats()["disk_hits"] == 6
+
+def test_prune_evicts_least_recently_touched(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=1, memory_entries=0)
+    cache.put("old", 1)
+    cache.put("new", 2)
+    old = time.time() - 2 * ResponseCache.TOUCH_AFTER_S
+    cache._db().execute("UPDATE responses SET accessed_at = ?", (old,))
+    assert cache.get("old") == 1  # stale access time: refreshed, so "new" is the LRU entry now
+    cache.prune()
+    assert cache.get("old") == 1 and cache.get("new") is None
@@ -0,0 +1,19 @@
+from __future__ import annotations
+import pandas as pd
+
+from claims_autopilot.denial import Codebook, load_codebook, load_codebook_index, lookup_meanings
+
+from conftest import DATA
+
+CODEBOOK = str(DATA / "carc_rarc_subset.csv")
+
+def test_load_codebook_still_returns_a_dataframe():
+    df = load_codebook(CODEBOOK)
+    assert isinstance(df, pd.DataFrame) and {"code_type", "code", "meaning"} <= set(df.columns)
+
+def test_index_lookups_match_the_dataframe():
+    df, index = load_codebook(CODEBOOK), load_codebook_index(CODEBOOK)
+    assert isinstance(index, Codebook) and load_codebook_index(CODEBOOK) is index  # cached
+    carc = [str(c) for c in df.loc[df["code_type"] == "CARC", "code"]] + ["999"]
+    rarc = [str(c) for c in df.loc[df["code_type"] == "RARC", "code"]] + ["Z99"]
+    assert lookup_meanings(df, carc, rarc) == lookup_meanings(index, carc, rarc) == index.lookup(carc, rarc)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+
+from claims_autopilot.batch import run_batch
+from claims_autopilot.duplicates import DuplicateIndex
+from claims_autopilot.extractor import parse_superbill
+
+from conftest import write_superbills
+
+def _flags(out: Path):
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    return {r["claim_id"]: (r["risk"], sorted(i["type"] for i in r["issues"])) for r in rows}
+
+def _batch_texts(superbill: str):
+    near = superbill.replace("Units: 1", "Units: 2")
+    return [superbill, superbill, near, superbill.replace("Member ID:", "Member ID: Z")]
+
+def test_claim_only_matches_earlier_claims(tmp_path, superbill):
+    packet = parse_superbill(superbill).model_dump()
+    index = DuplicateIndex(str(tmp_path / "dup.sqlite"))
+    assert index.check_and_add(packet, "a") == []
+    assert [i["type"] for i in index.check_and_add(packet, "b")] == ["duplicate_claim"]
+    # Re-checking the original must not flag it against its own later copy
+    assert index.check_and_add(packet, "a") == []
+    assert [i["type"] for i in index.check_and_add(packet, "b")] == ["duplicate_claim"]
+    assert index.check(packet) and index.check(packet, claim_id="a") == []
+    index.close()
+
+def test_rerun_keeps_duplicate_flags(tmp_path, rules, superbill):
+    paths = write_superbills(tmp_path / "in", _batch_texts(superbill))
+    dup = str(tmp_path / "dup.sqlite")
+    first = run_batch(paths, rules, str(tmp_path / "out1.jsonl"), workers=1, policy="regex-only", duplicates_path=dup)
+    # Several workers on the rerun: ordering must not matter any more
+    second = run_batch(paths, rules, str(tmp_path / "out2.jsonl"), workers=4, policy="regex-only", duplicates_path=dup)
+    assert first["duplicates"] == second["duplicates"]
+    assert first["duplicates"]["duplicate_claim"] == 1 and first["duplicates"]["near_duplicate"] == 1
+    assert _flags(tmp_path / "out1.jsonl") == _flags(tmp_path / "out2.jsonl")
+
+def test_journal_resume_keeps_duplicate_flags(tmp_path, rules, superbill):
+    paths = write_superbills(tmp_path / "in", _batch_texts(superbill))
+    kw = dict(workers=2, policy="regex-only", duplicates_path=str(tmp_path / "dup.sqlite"),
+              journal_path=str(tmp_path / "journal.sqlite"))
+    run_batch(paths, rules, str(tmp_path / "out.jsonl"), **kw)
+    before = _flags(tmp_path / "out.jsonl")
+    summary = run_batch(paths, rules, str(tmp_path / "out.jsonl"), **kw)
+    assert summary["journal"]["reused_packets"] == len(paths)
+    assert _flags(tmp_path / "out.jsonl") == before
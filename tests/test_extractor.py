@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import Dict
+
+import pytest
+
+from claims_autopilot.bench import synthetic_superbill
+from claims_autopilot.compact import CompactClaim
+from claims_autopilot.extractor import (_ODD_BREAK_RE, _regex_extract, _regex_extract_multipass, parse_superbill,
+                                        parse_superbill_compact)
+
+from conftest import DATA
+
+SAMPLE = (DATA / "sample_superbill.txt").read_text(encoding="utf-8")
+
+REPEATED_HEADERS = SAMPLE + """
+Patient: SECOND PATIENT
+DOB: 1980-05-06
+Member ID: Y987654321
+Rendering Provider NPI: 1111111111
+Date of Service: 2026-03-01
+
+Diagnoses (ICD-10):
+- E11.9 Type 2 diabetes
+
+Procedures (CPT/HCPCS):
+- 71046 Chest X-ray
+Units: 2
+Modifiers: 26
+Diagnosis pointer: 1, 2
+"""
+
+EDGE_CASES = {
+    "label_value_on_next_line": SAMPLE.replace("Insurance: ExamplePayer PPO", "Insurance:\n\nExamplePayer PPO"),
+    "label_at_end_of_text": SAMPLE + "Referring Provider ID:",
+    "label_followed_by_blank": SAMPLE.replace("Insurance: ExamplePayer PPO", "Insurance:   \n   "),
+    "tabs_and_padding": SAMPLE.replace(": ", ":\t ").replace("- 99213", "  -   99213"),
+    "no_sections": "Patient: A B\nDOB: 2001-02-03\nMember ID: Z1\n",
+    "empty": "",
+    "lowercase_labels": SAMPLE.lower(),
+    "imaging_providers": SAMPLE.replace("- 99213", "- 71046")
+    + "Ordering Provider: Dr Example\nReferring Provider ID: 1999999999\n",
+}
+
+def _corpus() -> Dict[str, str]:
+    base = {"sample": SAMPLE, "repeated_headers": REPEATED_HEADERS, **EDGE_CASES}
+    base.update({f"synthetic_{i}": synthetic_superbill(n_lines=1 + i % 4, seed=i) for i in range(12)})
+    corpus = dict(base)
+    for name, txt in base.items():
+        corpus[name + "_crlf"] = txt.replace("\n", "\r\n")
+        corpus[name + "_cr"] = txt.replace("\n", "\r")
+        corpus[name + "_mixed"] = txt.replace("\n", "\r\n", 3).replace("\n", "\r", 2)
+        corpus[name + "_unicode_breaks"] = txt.replace("\n", "\u2028", 4).replace("\n", "\x0c", 2)
+        corpus[name + "_no_final_newline"] = txt.rstrip("\n")
+    return corpus
+
+CORPUS = _corpus()
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_regex_extract_matches_the_multipass_reference(name):
+    txt = CORPUS[name]
+    reference = _regex_extract_multipass(txt).model_dump()
+    assert _regex_extract(txt).model_dump() == reference
+    if not _ODD_BREAK_RE.search(txt):
+        # The one-pass scanner itself must agree wherever _regex_extract routes to it
+        assert parse_superbill(txt).model_dump() == reference
+        assert parse_superbill_compact(txt).to_dict() == CompactClaim.from_packet(parse_superbill(txt)).to_dict()
+
+def test_corpus_covers_both_scanner_paths():
+    odd = sum(bool(_ODD_BREAK_RE.search(t)) for t in CORPUS.values())
+    assert 0 < odd < len(CORPUS)
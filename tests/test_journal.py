@@ -0,0 +1,104 @@
+from __future__ import annotations
+import csv, json, os, subprocess, sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from claims_autopilot.batch import run_batch
+from claims_autopilot.bench import synthetic_superbill
+
+from conftest import ROOT, write_superbills
+
+N_CLAIMS = 12
+CHECKPOINT = 5
+
+# Runs precheck-batch in a child process that dies like kill -9 (os._exit: no cleanup, no finally)
+# at a chosen point of the export: while parts are still open, between committing the packets and
+# the lines part of a checkpoint, or after a checkpoint's files are committed but before the journal
+# marks it finished.
+CHILD = """
+import os, sys
+from functools import partial
+from claims_autopilot import batch, generator, journal
+from claims_autopilot.validator import load_rules
+
+mode, inputs, out, export_dir, journal_path, rules_path = sys.argv[1:7]
+calls = {"n": 0}
+
+def die_on(cls, name, call_no):
+    real = getattr(cls, name)
+    def wrapped(*a, **k):
+        calls["n"] += 1
+        if calls["n"] == call_no:
+            os._exit(9)
+        return real(*a, **k)
+    setattr(cls, name, wrapped)
+
+batch.ClaimExporter = partial(generator.ClaimExporter, batch_size=1)  # every claim reaches the part files
+if mode == "open_parts":
+    die_on(generator.ClaimExporter, "write", 8)  # claims 1-5 checkpointed, 6-7 in open .tmp parts
+elif mode == "mid_commit":
+    die_on(generator._PartFile, "_commit", 4)  # 2nd checkpoint: packets part committed, lines part not
+elif mode == "before_finish":
+    die_on(journal.JobJournal, "finish_export", 2)  # 2nd checkpoint: both files committed
+paths = sorted(batch.collect_inputs(inputs))
+batch.run_batch(paths, load_rules(rules_path), out, workers=1, policy="regex-only", export_dir=export_dir,
+                lines_format="csv", journal_path=journal_path, checkpoint_every=%d)
+""" % CHECKPOINT
+
+def _crash(tmp_path: Path, mode: str) -> dict:
+    inputs = tmp_path / "in"
+    paths = write_superbills(inputs, [synthetic_superbill(n_lines=1 + i % 3, seed=i) for i in range(N_CLAIMS)])
+    args = dict(out=str(tmp_path / "out.jsonl"), export_dir=str(tmp_path / "export"),
+                journal_path=str(tmp_path / "journal.sqlite"))
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    proc = subprocess.run([sys.executable, "-c", CHILD, mode, str(inputs), args["out"], args["export_dir"],
+                           args["journal_path"], str(ROOT / "data" / "rules.yml")], env=env, cwd=str(tmp_path))
+    assert proc.returncode == 9
+    return {"paths": paths, **args}
+
+def _exported(export_dir: str):
+    packets = []
+    for p in sorted(Path(export_dir).glob("*.jsonl")):
+        packets += p.read_text(encoding="utf-8").splitlines()
+    lines: Counter = Counter()
+    for p in sorted(Path(export_dir).glob("*-lines-*.csv")):
+        with open(p, encoding="utf-8", newline="") as f:
+            lines.update(row["claim_id"] for row in csv.DictReader(f))
+    return packets, lines
+
+@pytest.mark.parametrize("mode, recovered", [
+    ("open_parts", {"adopted": 0, "rolled_back": 0, "orphans_removed": 2}),  # packets + lines .tmp
+    ("mid_commit", {"adopted": 0, "rolled_back": 1, "orphans_removed": 0}),
+    ("before_finish", {"adopted": 1, "rolled_back": 0, "orphans_removed": 0}),
+])
+def test_resume_after_kill_exports_each_claim_once(tmp_path, rules, mode, recovered):
+    run = _crash(tmp_path, mode)
+    export = Path(run["export_dir"])
+    if mode == "open_parts":
+        assert list(export.glob("*.tmp")), "the kill should leave open parts behind"
+    other_run = export / "precheck-20260101-000000-1-00001.jsonl.tmp"  # a concurrent run's open part
+    other_run.write_text("{}\n", encoding="utf-8")
+
+    summary = run_batch(run["paths"], rules, run["out"], workers=2, policy="regex-only", export_dir=run["export_dir"],
+                        lines_format="csv", journal_path=run["journal_path"], checkpoint_every=CHECKPOINT)
+
+    assert summary["journal"]["recovered_exports"] == recovered
+    assert summary["journal"]["status_counts"]["exported"] == N_CLAIMS
+    assert sorted(export.glob("*.tmp")) == [other_run]
+
+    packets, lines = _exported(run["export_dir"])
+    assert len(packets) == N_CLAIMS and len(set(packets)) == N_CLAIMS
+    expected = {os.path.abspath(p): 1 + i % 3 for i, p in enumerate(run["paths"])}
+    assert dict(lines) == expected
+
+def test_resume_without_crash_exports_nothing_twice(tmp_path, rules):
+    paths = write_superbills(tmp_path / "in", [synthetic_superbill(seed=i) for i in range(4)])
+    kw = dict(workers=2, policy="regex-only", export_dir=str(tmp_path / "export"), lines_format="csv",
+              journal_path=str(tmp_path / "journal.sqlite"))
+    first = run_batch(paths, rules, str(tmp_path / "out.jsonl"), **kw)
+    second = run_batch(paths, rules, str(tmp_path / "out.jsonl"), **kw)
+    assert first["export"]["claims"] == 4 and second["export"]["claims"] == 0
+    rows = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(rows) == 4 and all(r["status"] == "ok" for r in rows)
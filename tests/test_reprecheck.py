@@ -0,0 +1,79 @@
+from __future__ import annotations
+import copy, json
+from pathlib import Path
+
+import pytest
+
+from claims_autopilot.batch import run_batch
+from claims_autopilot.bench import synthetic_superbill
+from claims_autopilot.reprecheck import ClaimIndex, index_path, reprecheck_results, rule_paths
+from claims_autopilot.sharded import run_sharded
+
+from conftest import write_superbills
+
+def _texts(n: int = 30):
+    texts = [synthetic_superbill(n_lines=1 + i % 3, seed=i) for i in range(n)]
+    texts[3] = texts[3].replace("Place of Service: 11 (Office)\n", "")  # a claim missing a required field
+    texts[5] = texts[5].replace("Insurance: ExamplePayer PPO\n", "")
+    return texts
+
+def _edits(rules):
+    dropped = copy.deepcopy(rules)
+    dropped["required_fields"].remove("claim.place_of_service")
+    stricter = copy.deepcopy(rules)
+    stricter["basic_checks"][1]["min"] = 2  # claim.lines
+    new_code = copy.deepcopy(rules)
+    new_code["conditional_checks"][0]["codes"] = ["71046", "99213", "93000"]
+    new_field = copy.deepcopy(rules)  # a field no check read at batch time: the index has to be rebuilt
+    new_field["required_fields"].append("patient.insurance")
+    return {"dropped": dropped, "stricter": stricter, "new_code": new_code, "new_field": new_field}
+
+def _rows(path: Path):
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    return sorted(({k: v for k, v in r.items() if k != "elapsed_s"} for r in rows), key=lambda r: r["file"])
+
+@pytest.mark.parametrize("edit", ["dropped", "stricter", "new_code", "new_field"])
+def test_reprecheck_matches_a_full_rerun(tmp_path, rules, edit):
+    paths = write_superbills(tmp_path / "in", _texts())
+    new_rules = _edits(rules)[edit]
+    results = tmp_path / "results.jsonl"
+    run_batch(paths, rules, str(results), workers=2, policy="regex-only")
+    summary = reprecheck_results(str(results), new_rules)
+    rerun = run_batch(paths, new_rules, str(tmp_path / "rerun.jsonl"), workers=2, policy="regex-only")
+
+    assert summary["changed"] > 0 and summary["skipped"] > 0
+    assert summary["risk_counts"] == rerun["risk_counts"]
+    assert _rows(results) == _rows(tmp_path / "rerun.jsonl")
+    # The index left behind is current: a second edit uses it instead of rescanning the results
+    assert ClaimIndex.load(index_path(str(results)), results) is not None
+
+def test_untouched_rows_are_copied_byte_for_byte(tmp_path, rules):
+    paths = write_superbills(tmp_path / "in", _texts())
+    results = tmp_path / "results.jsonl"
+    run_batch(paths, rules, str(results), workers=1, policy="regex-only")
+    before = results.read_text(encoding="utf-8").splitlines()
+    summary = reprecheck_results(str(results), _edits(rules)["dropped"])
+    after = results.read_text(encoding="utf-8").splitlines()
+    assert summary["changed"] == 1
+    assert sum(a != b for a, b in zip(before, after)) == 1 and len(before) == len(after)
+
+def test_stale_index_is_rebuilt(tmp_path, rules):
+    paths = write_superbills(tmp_path / "in", _texts())
+    results = tmp_path / "results.jsonl"
+    run_batch(paths, rules, str(results), workers=1, policy="regex-only")
+    with open(results, "a", encoding="utf-8") as f:  # results edited after the batch
+        f.write(json.dumps({"file": "extra.txt", "status": "error", "error": "x"}) + "\n")
+    assert ClaimIndex.load(index_path(str(results)), results) is None
+    assert reprecheck_results(str(results), _edits(rules)["dropped"])["changed"] == 1
+    assert ClaimIndex.load(index_path(str(results)), results) is not None
+
+def test_batch_and_sharded_indexes_match_a_scan(tmp_path, rules):
+    paths = write_superbills(tmp_path / "in", _texts(12))
+    for name, run in [("batch", lambda out: run_batch(paths, rules, out, workers=3, policy="regex-only")),
+                      ("sharded", lambda out: run_sharded(paths, rules, out, processes=2, chunk_size=5))]:
+        results = tmp_path / f"{name}.jsonl"
+        run(str(results))
+        saved = json.loads(index_path(str(results)).read_text(encoding="utf-8"))
+        scan = ClaimIndex.scan(results, rule_paths(rules))
+        scan.save(tmp_path / "scan.json", results)
+        assert saved == json.loads((tmp_path / "scan.json").read_text(encoding="utf-8")), name
@@ -0,0 +1,45 @@
+from __future__ import annotations
+import asyncio, time
+
+from claims_autopilot.service import Service
+
+from conftest import DATA
+
+def _service() -> Service:
+    return Service(rules_path=str(DATA / "rules.yml"), codebook_path=str(DATA / "carc_rarc_subset.csv"))
+
+def test_precheck_batch_work_does_not_block_the_event_loop(superbill):
+    svc = _service()
+    validate = svc._validate
+
+    def slow_validate(packet, compiled):
+        time.sleep(0.05)  # stands in for a heavy rules.yml on a large micro-batch
+        return validate(packet, compiled)
+    svc._validate = slow_validate
+
+    async def main():
+        gaps, done = [], asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick = asyncio.create_task(ticker())
+        reqs = [{"text": superbill + f"\nRef: {i}", "extraction_policy": "regex-only"} for i in range(8)]
+        out = await svc._precheck_many(reqs)
+        done.set()
+        await tick
+        return out, gaps
+
+    out, gaps = asyncio.run(main())
+    assert len(out) == 8 and all("risk" in r for r in out)
+    assert len(gaps) > 20 and max(gaps) < 0.2  # 8 x 50 ms ran in a thread, not on the loop
+
+def test_denial_lookup_without_plan():
+    svc = _service()
+    out = asyncio.run(svc._denial_many([{"text": "CARC 16 RARC N290", "plan": False}]))
+    assert out[0]["carc"] == ["16"] and out[0]["rarc"] == ["N290"]
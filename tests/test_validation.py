@@ -0,0 +1,124 @@
+from __future__ import annotations
+import copy
+from typing import Any, Dict, List
+
+import pytest
+
+from claims_autopilot.bench import synthetic_superbill
+from claims_autopilot.columnar import packets_to_frames, validate_frame
+from claims_autopilot.compact import CompactClaim
+from claims_autopilot.extractor import parse_superbill, parse_superbill_compact
+from claims_autopilot.validator import compile_rules, load_rules, validate, validate_compiled
+
+from conftest import DATA
+
+# Every validation path must produce the same risk and issue list (same order) as validate() on
+# packet dicts with the plain rules, for the shipped rules.yml and for custom rules that exercise
+# each check type's edge cases.
+
+CUSTOM_RULES_YML = """
+required_fields:
+  - patient.dob
+  - patient.insurance
+  - meta.source
+  - patient.sex
+  - claim.lines
+basic_checks:
+  - name: "Two diagnoses"
+    type: "min_list_len"
+    path: "claim.diagnoses"
+    min: 2
+    message: "Need two diagnoses"
+  - type: "min_list_len"
+    path: "claim.lines"
+    min: 2
+  - type: "min_list_len"
+    path: "patient.dob"
+  - type: "not_a_known_check"
+    path: "patient.name"
+conditional_checks:
+  - type: "requires_field_for_codes"
+    codes: ["99213", " 93000 "]
+    field: "providers.referring_provider_id"
+    message: "Referrer needed for {codes}"
+  - type: "requires_field_for_codes"
+    codes: []
+    field: "patient.dob"
+  - type: "requires_field_for_codes"
+    codes: [71046]
+    field: "claim.place_of_service"
+  - type: "requires_field_for_codes"
+    codes: ["71046", "36415"]
+    field: "claim.diagnoses"
+"""
+
+def _packets() -> List[Dict[str, Any]]:
+    base = [parse_superbill(synthetic_superbill(n_lines=1 + i % 3, seed=i)).model_dump() for i in range(16)]
+    base.append(parse_superbill((DATA / "sample_superbill.txt").read_text(encoding="utf-8")).model_dump())
+    mutations = [
+        lambda p: p["patient"].update(dob=None),
+        lambda p: p["patient"].update(insurance=""),
+        lambda p: p["claim"].update(diagnoses=[]),
+        lambda p: p["claim"].update(lines=[]),
+        lambda p: p["claim"].update(place_of_service=None, diagnoses=["M54.5"]),
+        lambda p: p["claim"]["lines"].append({"cpt_hcpcs": " 71046 ", "units": 1, "modifiers": [], "diagnosis_pointer": []}),
+        lambda p: p["claim"]["lines"].append({"cpt_hcpcs": "", "units": 1, "modifiers": [], "diagnosis_pointer": []}),
+        lambda p: p["claim"]["lines"].insert(0, {"cpt_hcpcs": "71046", "units": 2, "modifiers": ["26"], "diagnosis_pointer": [1]}),
+        lambda p: p["providers"].update(ordering_provider_name="Dr Example", referring_provider_id=""),
+        lambda p: p["meta"].update(source="fax"),
+        lambda p: p["meta"].update(source=""),
+        lambda p: None,
+    ]
+    packets = []
+    for i, p in enumerate(base):
+        p = copy.deepcopy(p)
+        mutations[i % len(mutations)](p)
+        if i % 4 == 3:
+            mutations[(i * 5) % len(mutations)](p)
+        p["meta"]["claim_id"] = f"C{i:03d}"
+        packets.append(p)
+    return packets
+
+PACKETS = _packets()
+
+@pytest.fixture(params=["rules.yml", "custom"])
+def any_rules(request, rules, tmp_path) -> Dict[str, Any]:
+    if request.param == "rules.yml":
+        return rules
+    path = tmp_path / "rules.yml"
+    path.write_text(CUSTOM_RULES_YML, encoding="utf-8")
+    return load_rules(str(path))
+
+def _expected(rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [validate(p, rules) for p in PACKETS]
+
+def test_corpus_exercises_every_risk(rules):
+    assert {validate(p, rules)["risk"] for p in PACKETS} == {"LOW", "MEDIUM", "HIGH"}
+
+def test_compiled_rules_match_validate(any_rules):
+    compiled = compile_rules(any_rules)
+    expected = _expected(any_rules)
+    assert [validate_compiled(p, compiled) for p in PACKETS] == expected
+    assert [validate(p, compiled) for p in PACKETS] == expected
+
+def test_validate_frame_matches_validate(any_rules):
+    claims, lines = packets_to_frames(PACKETS)
+    out = validate_frame(claims, lines, any_rules)
+    assert list(out["claim_id"]) == [p["meta"]["claim_id"] for p in PACKETS]
+    got = [{"risk": risk, "issues": issues} for risk, issues in zip(out["risk"], out["issues"])]
+    assert got == _expected(any_rules)
+    assert list(out["issue_count"]) == [len(r["issues"]) for r in got]
+
+def test_compact_claims_match_validate(any_rules):
+    compiled = compile_rules(any_rules)
+    expected = _expected(any_rules)
+    compact = [CompactClaim.from_dict(p) for p in PACKETS]
+    assert [validate(c, any_rules) for c in compact] == expected
+    assert [validate(c, compiled) for c in compact] == expected
+    assert [validate_compiled(c, compiled.for_compact()) for c in compact] == expected
+
+def test_compact_extraction_validates_like_the_packet(any_rules):
+    compiled = compile_rules(any_rules)
+    for i in range(8):
+        txt = synthetic_superbill(n_lines=1 + i % 3, seed=100 + i)
+        assert validate(parse_superbill_compact(txt), compiled) == validate(parse_superbill(txt).model_dump(), any_rules)